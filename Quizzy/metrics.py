@@ -0,0 +1,255 @@
+"""
+Per-request performance metrics.
+
+RequestMetricsMiddleware records, for every request, the resolved view name,
+the number of database queries and the time spent in them, the time spent
+producing the response body (serializer `.data` plus rendering) and the total
+latency. They are reported as a Server-Timing header and aggregated into
+Prometheus histograms served by `metrics_view`.
+
+DRF has no hook around serializer `.data`, so with METRICS_SERIALIZER_TIMING
+`install()` replaces the `data` property of Serializer and ListSerializer for
+the whole process with a timed wrapper. Outside a request the wrapper only
+reads a context variable; `uninstall()` puts DRF's properties back. Without
+it the serialize timing covers rendering only.
+
+The histograms live in process memory, so with several server processes each
+one exposes its own series and the scraper has to sum them.
+"""
+import bisect
+import contextvars
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+from rest_framework import serializers
+
+logger = logging.getLogger('quizzy.metrics')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+UNRESOLVED = '<unresolved>'
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self, record_sql):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.serializing = 0
+        self.sql = [] if record_sql else None
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets, labels):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.labels = labels
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self.lock:
+            counts, total = self.series.get(label_values, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.series[label_values] = (counts, total + value)
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            series = sorted(self.series.items())
+        for label_values, (counts, total) in series:
+            labels = ','.join(f'{label}="{escape(value)}"' for label, value in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip([*self.buckets, '+Inf'], counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+        return '\n'.join(lines)
+
+
+def escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+REQUEST_SECONDS = Histogram('quizzy_request_duration_seconds', 'Total request latency.',
+                            LATENCY_BUCKETS, ('view', 'method'))
+DB_QUERIES = Histogram('quizzy_request_db_queries', 'Database queries per request.',
+                       QUERY_BUCKETS, ('view', 'method'))
+DB_SECONDS = Histogram('quizzy_request_db_seconds', 'Time spent in database queries per request.',
+                       LATENCY_BUCKETS, ('view', 'method'))
+SERIALIZE_SECONDS = Histogram('quizzy_request_serialize_seconds',
+                              'Time spent serializing and rendering the response per request.',
+                              LATENCY_BUCKETS, ('view', 'method'))
+HISTOGRAMS = (REQUEST_SECONDS, DB_QUERIES, DB_SECONDS, SERIALIZE_SECONDS)
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_seconds += time.perf_counter() - started
+        if metrics.sql is not None:
+            metrics.sql.append(sql)
+
+
+def instrument_connection(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def connection_opened(sender, connection, **kwargs):
+    instrument_connection(connection)
+
+
+SERIALIZER_CLASSES = (serializers.Serializer, serializers.ListSerializer)
+
+
+def timed_data(data):
+    # only the outermost .data of a request counts, nested serializers run inside it
+    def wrapper(self):
+        metrics = _current.get()
+        if metrics is None or metrics.serializing:
+            return data.fget(self)
+        metrics.serializing += 1
+        started = time.perf_counter()
+        try:
+            return data.fget(self)
+        finally:
+            metrics.serializing -= 1
+            metrics.serialize_seconds += time.perf_counter() - started
+    wrapper.untimed = data
+    return property(wrapper)
+
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def install():
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        _installed = True
+        connection_created.connect(connection_opened)
+        if not settings.METRICS_SERIALIZER_TIMING:
+            return
+        for serializer_class in SERIALIZER_CLASSES:
+            data = serializer_class.__dict__.get('data')
+            if isinstance(data, property) and hasattr(data.fget, 'untimed'):
+                continue
+            # leave alone a data attribute something else already replaced
+            if not isinstance(data, property):
+                logger.warning('Not timing %s.data, it is not the property DRF defines.', serializer_class.__name__)
+                continue
+            serializer_class.data = timed_data(data)
+
+
+def uninstall():
+    global _installed
+    with _install_lock:
+        connection_created.disconnect(connection_opened)
+        for serializer_class in SERIALIZER_CLASSES:
+            untimed = getattr(serializer_class.__dict__['data'].fget, 'untimed', None)
+            if untimed is not None:
+                serializer_class.data = untimed
+        _installed = False
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        install()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics, token = self.begin()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics, token = self.begin()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def begin(self):
+        # connections opened before install() missed connection_created
+        for connection in connections.all(initialized_only=True):
+            instrument_connection(connection)
+        metrics = RequestMetrics(record_sql=settings.METRICS_QUERY_LOG_THRESHOLD is not None)
+        return metrics, _current.set(metrics)
+
+    def process_template_response(self, request, response):
+        # DRF responses render after the middleware chain, time them with a post-render callback
+        metrics = _current.get()
+        if metrics is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                metrics.serialize_seconds += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, request, response, metrics):
+        total = time.perf_counter() - metrics.started
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else UNRESOLVED
+        if view == 'metrics':
+            return response
+
+        REQUEST_SECONDS.observe(total, view, request.method)
+        DB_QUERIES.observe(metrics.queries, view, request.method)
+        DB_SECONDS.observe(metrics.db_seconds, view, request.method)
+        SERIALIZE_SECONDS.observe(metrics.serialize_seconds, view, request.method)
+
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={metrics.db_seconds * 1000:.1f};desc="{metrics.queries} queries"',
+                f'serialize;dur={metrics.serialize_seconds * 1000:.1f}',
+                f'total;dur={total * 1000:.1f}',
+            ])
+
+        threshold = settings.METRICS_QUERY_LOG_THRESHOLD
+        if threshold is not None and metrics.queries > threshold:
+            logger.warning(
+                '%s %s (%s) ran %d queries:\n%s',
+                request.method, request.path, view, metrics.queries, '\n'.join(metrics.sql),
+            )
+        return response
+
+
+def metrics_view(request):
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    body = '\n'.join(histogram.expose() for histogram in HISTOGRAMS) + '\n'
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'Quizzy.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -73,13 +75,99 @@ WSGI_APPLICATION = 'Quizzy.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# QUIZZY_DB_ENGINE picks the backend. PostgreSQL keeps connections open for
+# QUIZZY_DB_CONN_MAX_AGE seconds, or with QUIZZY_DB_POOL=1 uses psycopg's
+# connection pool instead (the two are mutually exclusive).
+DB_ENGINE = os.environ.get('QUIZZY_DB_ENGINE', 'sqlite')
+SQLITE_TUNING = os.environ.get('QUIZZY_SQLITE_TUNING', '1') == '1'
+
+if DB_ENGINE == 'postgres':
+    DB_POOL = os.environ.get('QUIZZY_DB_POOL', '') == '1'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('QUIZZY_DB_NAME', 'quizzy'),
+            'USER': os.environ.get('QUIZZY_DB_USER', ''),
+            'PASSWORD': os.environ.get('QUIZZY_DB_PASSWORD', ''),
+            'HOST': os.environ.get('QUIZZY_DB_HOST', ''),
+            'PORT': os.environ.get('QUIZZY_DB_PORT', ''),
+            'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('QUIZZY_DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': not DB_POOL,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('QUIZZY_DB_POOL_MIN', 2)),
+                    'max_size': int(os.environ.get('QUIZZY_DB_POOL_MAX', 20)),
+                    'timeout': int(os.environ.get('QUIZZY_DB_POOL_TIMEOUT', 10)),
+                },
+            } if DB_POOL else {},
+        }
     }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('QUIZZY_DB_NAME', BASE_DIR / 'db.sqlite3'),
+            # take the write lock at BEGIN, so waiting writers queue on busy_timeout
+            # instead of failing with "database is locked" when they upgrade
+            'OPTIONS': {'transaction_mode': 'IMMEDIATE'} if SQLITE_TUNING else {},
+            'TEST': {
+                # a file rather than shared-cache memory, so concurrent tests get real locking
+                'NAME': BASE_DIR / 'test_db.sqlite3',
+            },
+        }
+    }
+
+# Applied to every new SQLite connection by core.signals; QUIZZY_SQLITE_TUNING=0 turns them off
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.environ.get('QUIZZY_SQLITE_BUSY_TIMEOUT', 5000)),
+    'mmap_size': int(os.environ.get('QUIZZY_SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'temp_store': 'MEMORY',
+} if SQLITE_TUNING else {}
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'quizzy',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('QUIZZY_CACHE_LOCATION', '/var/tmp/quizzy_cache'),
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('QUIZZY_CACHE_LOCATION', 'redis://127.0.0.1:6379'),
+    },
+}
+
+CACHES = {
+    'default': CACHE_BACKENDS[os.environ.get('QUIZZY_CACHE_BACKEND', 'locmem')],
 }
 
+# Rendered quiz and question responses, keyed by quiz content version
+QUIZ_RESPONSE_CACHE_TIMEOUT = 60 * 60
+
+# Share of a quiz's maximum score needed to pass it
+QUIZ_PASS_RATIO = 0.5
+
+# Request metrics (Quizzy.metrics): the Server-Timing header, timing of serializer .data
+# (which wraps DRF's Serializer.data for the process), the addresses allowed to scrape
+# /metrics and the query count above which a request's SQL is logged
+METRICS_SERVER_TIMING = True
+METRICS_SERIALIZER_TIMING = True
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+METRICS_QUERY_LOG_THRESHOLD = int(os.environ.get('QUIZZY_METRICS_QUERY_LOG_THRESHOLD', 50)) or None
+
+# Queue finished attempts for run_grading_workers instead of grading them in the request
+QUIZ_DEFERRED_GRADING = os.environ.get('QUIZ_DEFERRED_GRADING', '') == '1'
+
+# Serve attempts and quiz reads from core.async_views (run under ASGI)
+QUIZZY_ASYNC_VIEWS = os.environ.get('QUIZZY_ASYNC_VIEWS', '') == '1'
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
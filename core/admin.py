@@ -1,8 +1,90 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Count, Q
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import Question, Quiz, Attempt, AnswerOption, UserAnswer
+from .models import Question, Quiz, Attempt, AnswerOption, UserAnswer, QuizStats
+
+
+def estimated_count(model):
+    """Row count from the planner statistics, None when there are none."""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            row = cursor.fetchone()
+            # -1 until the table is first analyzed
+            return row[0] if row and row[0] >= 0 else None
+        if connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+            row = cursor.fetchone()
+            return int(row[0].split()[0]) if row else None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginates big changelists without a full COUNT(*).
+
+    An unfiltered list takes the row estimate of the table (kept by ANALYZE)
+    once it is over `exact_limit`; a filtered one counts at most `exact_limit`
+    rows, so only the first pages of a huge match can be reached.
+    """
+    exact_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model)
+            if estimate is not None and estimate > self.exact_limit:
+                return estimate
+        return queryset[:self.exact_limit].count()
+
+
+class InputFilter(admin.SimpleListFilter):
+    """A text box instead of a link per value, for relations with too many rows to list."""
+    template = 'admin/core/input_filter.html'
+    lookup = None
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.lookup: self.value()})
+        return queryset
+
+    def choices(self, changelist):
+        yield {
+            'hidden': [
+                (name, value)
+                for name, values in changelist.params.items()
+                if name not in (self.parameter_name, 'p')
+                for value in values
+            ],
+            'clear_query_string': changelist.get_query_string(remove=[self.parameter_name]),
+        }
+
+
+def input_filter(title, field, lookup='exact'):
+    return type('InputFilter', (InputFilter,), {
+        'title': title, 'parameter_name': field, 'lookup': f'{field}__{lookup}',
+    })
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class AnswerOptionInline(admin.TabularInline):
@@ -21,10 +103,12 @@ class QuestionInline(admin.TabularInline):
 
 
 @admin.register(Quiz)
-class QuizAdmin(admin.ModelAdmin):
+class QuizAdmin(LargeTableAdmin):
     list_display = ('title', 'owner', 'question_count', 'is_active', 'created_at', 'attempts_count')
-    list_filter = ('is_active', 'created_at', 'owner')
+    list_filter = ('is_active', 'created_at', input_filter('владелец', 'owner__username'))
+    list_select_related = ('owner', 'stats')
     search_fields = ('title', 'description', 'owner__username')
+    autocomplete_fields = ('owner',)
     list_editable = ('is_active',)
     readonly_fields = ('created_at', 'question_count', 'attempts_count')
     inlines = [QuestionInline]
@@ -36,6 +120,9 @@ class QuizAdmin(admin.ModelAdmin):
         ('Статус', {
             'fields': ('is_active', 'created_at')
         }),
+        ('Прохождение', {
+            'fields': ('sample_size', 'shuffle_options')
+        }),
         ('Статистика', {
             'fields': ('question_count', 'attempts_count'),
             'classes': ('collapse',)
@@ -43,19 +130,27 @@ class QuizAdmin(admin.ModelAdmin):
     )
     
     def question_count(self, obj):
-        return obj.questions.count()
+        return obj.questions_count
     question_count.short_description = 'Количество вопросов'
+    question_count.admin_order_field = 'questions_count'
     
     def attempts_count(self, obj):
-        return obj.attempts.count()
+        try:
+            return obj.stats.attempts_count
+        except QuizStats.DoesNotExist:
+            return 0
     attempts_count.short_description = 'Количество попыток'
 
 
 @admin.register(Question)
-class QuestionAdmin(admin.ModelAdmin):
+class QuestionAdmin(LargeTableAdmin):
     list_display = ('text_preview', 'quiz', 'score', 'options_count', 'correct_options_count')
-    list_filter = ('quiz', 'score', 'quiz__owner')
+    list_filter = (
+        input_filter('тест', 'quiz__title', 'icontains'), 'score', input_filter('владелец', 'quiz__owner__username'),
+    )
+    list_select_related = ('quiz',)
     search_fields = ('text', 'quiz__title')
+    autocomplete_fields = ('quiz',)
     list_editable = ('score',)
     inlines = [AnswerOptionInline]
     
@@ -69,20 +164,34 @@ class QuestionAdmin(admin.ModelAdmin):
         return obj.text[:100] + '...' if len(obj.text) > 100 else obj.text
     text_preview.short_description = 'Текст вопроса'
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            options_total=Count('options'),
+            correct_options_total=Count('options', filter=Q(options__is_correct=True)),
+        )
+    
     def options_count(self, obj):
-        return obj.options.count()
+        return obj.options_total
     options_count.short_description = 'Вариантов ответа'
+    options_count.admin_order_field = 'options_total'
     
     def correct_options_count(self, obj):
-        return obj.options.filter(is_correct=True).count()
+        return obj.correct_options_total
     correct_options_count.short_description = 'Правильных ответов'
+    correct_options_count.admin_order_field = 'correct_options_total'
 
 
 @admin.register(AnswerOption)
-class AnswerOptionAdmin(admin.ModelAdmin):
+class AnswerOptionAdmin(LargeTableAdmin):
     list_display = ('answer', 'question_preview', 'quiz_title', 'is_correct')
-    list_filter = ('is_correct', 'question__quiz', 'question__quiz__owner')
+    list_filter = (
+        'is_correct',
+        input_filter('тест', 'question__quiz__title', 'icontains'),
+        input_filter('владелец', 'question__quiz__owner__username'),
+    )
+    list_select_related = ('question__quiz',)
     search_fields = ('answer', 'question__text', 'question__quiz__title')
+    autocomplete_fields = ('question',)
     list_editable = ('is_correct',)
     
     def question_preview(self, obj):
@@ -95,10 +204,15 @@ class AnswerOptionAdmin(admin.ModelAdmin):
 
 
 @admin.register(Attempt)
-class AttemptAdmin(admin.ModelAdmin):
+class AttemptAdmin(LargeTableAdmin):
     list_display = ('user', 'quiz', 'score', 'started_at', 'completed_at', 'completion_status')
-    list_filter = ('quiz', 'started_at', 'completed_at', 'user')
+    list_filter = (
+        input_filter('тест', 'quiz__title', 'icontains'), 'started_at', 'completed_at',
+        input_filter('пользователь', 'user__username'),
+    )
+    list_select_related = ('user', 'quiz')
     search_fields = ('user__username', 'quiz__title')
+    autocomplete_fields = ('user', 'quiz')
     readonly_fields = ('started_at', 'score')
     date_hierarchy = 'started_at'
     
@@ -120,9 +234,13 @@ class AttemptAdmin(admin.ModelAdmin):
 
 
 @admin.register(UserAnswer)
-class UserAnswerAdmin(admin.ModelAdmin):
+class UserAnswerAdmin(LargeTableAdmin):
     list_display = ('user', 'quiz', 'question_preview', 'selected_answer', 'is_correct', 'attempt_date')
-    list_filter = ('select__is_correct', 'attempt__quiz', 'attempt__started_at')
+    list_filter = (
+        'select__is_correct', input_filter('тест', 'attempt__quiz__title', 'icontains'), 'attempt__started_at',
+        input_filter('пользователь', 'attempt__user__username'),
+    )
+    list_select_related = ('attempt__user', 'attempt__quiz', 'question', 'select')
     search_fields = ('attempt__user__username', 'question__text', 'select__answer')
     readonly_fields = ('attempt', 'question', 'select')
     
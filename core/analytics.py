@@ -0,0 +1,159 @@
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Greatest
+
+from .models import Attempt, QuestionOptionStats, QuizScoreBucket, QuizStats, UserAnswer
+
+
+def increment_quiz_stats(quiz_id, **counters):
+    updates = {field: F(field) + value for field, value in counters.items()}
+    if not QuizStats.objects.filter(quiz_id=quiz_id).update(**updates):
+        QuizStats.objects.bulk_create([QuizStats(quiz_id=quiz_id)], ignore_conflicts=True)
+        QuizStats.objects.filter(quiz_id=quiz_id).update(**updates)
+
+
+async def aincrement_quiz_stats(quiz_id, **counters):
+    updates = {field: F(field) + value for field, value in counters.items()}
+    if not await QuizStats.objects.filter(quiz_id=quiz_id).aupdate(**updates):
+        await QuizStats.objects.abulk_create([QuizStats(quiz_id=quiz_id)], ignore_conflicts=True)
+        await QuizStats.objects.filter(quiz_id=quiz_id).aupdate(**updates)
+
+
+def record_started_attempt(attempt):
+    increment_quiz_stats(attempt.quiz_id, attempts_count=1)
+
+
+async def arecord_started_attempt(attempt):
+    await aincrement_quiz_stats(attempt.quiz_id, attempts_count=1)
+
+
+def record_completed_attempt(attempt, answer_key):
+    """
+    Fold a sealed attempt into the quiz aggregates with a fixed number of
+    writes: the quiz totals, its score bucket and the selected options.
+    """
+    increment_quiz_stats(
+        attempt.quiz_id,
+        completed_count=1,
+        passed_count=int(attempt.score >= answer_key.pass_score_of(attempt.question_ids)),
+        score_total=attempt.score,
+    )
+
+    bucket = QuizScoreBucket.objects.filter(quiz_id=attempt.quiz_id, score=attempt.score)
+    if not bucket.update(attempts_count=F('attempts_count') + 1):
+        QuizScoreBucket.objects.bulk_create(
+            [QuizScoreBucket(quiz_id=attempt.quiz_id, score=attempt.score)], ignore_conflicts=True,
+        )
+        bucket.update(attempts_count=F('attempts_count') + 1)
+
+    selected = list(UserAnswer.objects.filter(attempt=attempt).values_list('select_id', 'question_id'))
+    if selected:
+        QuestionOptionStats.objects.bulk_create([
+            QuestionOptionStats(option_id=option_id, question_id=question_id, quiz_id=attempt.quiz_id)
+            for option_id, question_id in selected
+        ], ignore_conflicts=True)
+        QuestionOptionStats.objects.filter(
+            option_id__in=[option_id for option_id, _ in selected],
+        ).update(selections=F('selections') + 1)
+
+
+def forget_attempt(attempt, answer_key):
+    """
+    Take a deleted attempt back out of the quiz aggregates. Its answers have
+    to still exist; counters that drifted below it stop at zero.
+    """
+    counters = {'attempts_count': 1}
+    if attempt.completed_at is not None:
+        counters.update(
+            completed_count=1,
+            passed_count=int(attempt.score >= answer_key.pass_score_of(attempt.question_ids)),
+            score_total=attempt.score,
+        )
+        QuizScoreBucket.objects.filter(quiz_id=attempt.quiz_id, score=attempt.score).update(
+            attempts_count=Greatest(F('attempts_count') - 1, 0),
+        )
+        QuestionOptionStats.objects.filter(
+            option_id__in=UserAnswer.objects.filter(attempt=attempt).values('select_id'),
+        ).update(selections=Greatest(F('selections') - 1, 0))
+
+    QuizStats.objects.filter(quiz_id=attempt.quiz_id).update(**{
+        field: Greatest(F(field) - value, 0) for field, value in counters.items()
+    })
+
+
+def rebuild_quiz_stats(quiz, answer_key):
+    attempts = Attempt.objects.filter(quiz=quiz)
+    completed = attempts.filter(completed_at__isnull=False)
+
+    with transaction.atomic():
+        QuizStats.objects.filter(quiz=quiz).delete()
+        QuizScoreBucket.objects.filter(quiz=quiz).delete()
+        QuestionOptionStats.objects.filter(quiz=quiz).delete()
+
+        totals = completed.aggregate(
+            completed_count=Count('id'),
+            passed_count=Count('id', filter=Q(question_ids__isnull=True, score__gte=answer_key.pass_score)),
+            score_total=Sum('score'),
+        )
+        # attempts of a sampled quiz pass on the questions they were asked
+        drawn = completed.filter(question_ids__isnull=False).values_list('score', 'question_ids')
+        totals['passed_count'] += sum(
+            score >= answer_key.pass_score_of(question_ids) for score, question_ids in drawn.iterator()
+        )
+        QuizStats.objects.create(
+            quiz=quiz,
+            attempts_count=attempts.count(),
+            completed_count=totals['completed_count'],
+            passed_count=totals['passed_count'],
+            score_total=totals['score_total'] or 0,
+        )
+
+        QuizScoreBucket.objects.bulk_create([
+            QuizScoreBucket(quiz=quiz, score=row['score'], attempts_count=row['total'])
+            for row in completed.order_by().values('score').annotate(total=Count('id'))
+        ])
+
+        selections = UserAnswer.objects.filter(
+            attempt__quiz=quiz, attempt__completed_at__isnull=False,
+        ).order_by().values('select_id', 'question_id').annotate(total=Count('id'))
+        QuestionOptionStats.objects.bulk_create([
+            QuestionOptionStats(option_id=row['select_id'], question_id=row['question_id'], quiz=quiz,
+                                selections=row['total'])
+            for row in selections
+        ], batch_size=1000)
+
+
+def quiz_report(quiz, answer_key):
+    """Build the analytics payload from the aggregate tables and the answer key."""
+    stats = QuizStats.objects.filter(quiz=quiz).first() or QuizStats(quiz=quiz)
+    buckets = QuizScoreBucket.objects.filter(quiz=quiz).values_list('score', 'attempts_count')
+    selections = dict(QuestionOptionStats.objects.filter(quiz=quiz).values_list('option_id', 'selections'))
+
+    questions = {}
+    for option_id, (question_id, is_correct, _) in sorted(answer_key.options.items()):
+        question = questions.setdefault(question_id, {
+            'question_id': question_id,
+            'answered': 0,
+            'correct': 0,
+            'options': [],
+        })
+        count = selections.get(option_id, 0)
+        question['answered'] += count
+        if is_correct:
+            question['correct'] += count
+        question['options'].append({'option_id': option_id, 'is_correct': is_correct, 'selections': count})
+
+    completed = stats.completed_count
+    return {
+        'quiz_id': quiz.id,
+        'attempts_count': stats.attempts_count,
+        'completed_count': completed,
+        'passed_count': stats.passed_count,
+        'pass_rate': stats.passed_count / completed if completed else None,
+        'average_score': stats.score_total / completed if completed else None,
+        # attempts of a sampled quiz each have the max and pass score of their draw
+        'max_score': None if quiz.sample_size else answer_key.max_score,
+        'pass_score': None if quiz.sample_size else answer_key.pass_score,
+        'score_distribution': [{'score': score, 'count': count} for score, count in buckets],
+        'questions': sorted(questions.values(), key=lambda question: question['question_id']),
+    }
@@ -0,0 +1,237 @@
+import base64
+import binascii
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import aauthenticate
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse
+from django.shortcuts import aget_object_or_404
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+
+from .attempts import AttemptError, astart_attempt, autosave_answers, finish_attempt, submit_attempt
+from .caching import (
+    conditional_response, patch_validators, quiz_etag, quiz_state, response_cache_key, set_owner_flag,
+)
+from .models import Question, Quiz
+from .serializers import AttemptSerializer, QuestionSerializer, QuizSerializer
+from .views import QuizDetailAPIView, QuizQuestionDetailAPIView, QuizQuestionsListAPIView
+
+MEDIA_TYPE = 'application/json'
+
+
+class AsyncAPIView(View):
+    """
+    Async counterpart of an authenticated DRF APIView.
+
+    Authenticates the way the default DRF session and basic authentication
+    do, requires an authenticated user and renders with DRF's JSONRenderer,
+    so responses and error bodies are the ones the sync views produce.
+    Methods without an async handler are passed to `sync_view`.
+    """
+    renderer = JSONRenderer()
+    sync_view = None
+    sync_handler = None
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        if cls.sync_view is not None:
+            initkwargs.setdefault('sync_handler', sync_to_async(cls.sync_view.as_view()))
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        method = request.method.lower()
+        handler = getattr(self, method, None) if method in self.http_method_names else None
+        if handler is None and self.sync_handler is not None:
+            return await self.sync_handler(request, *args, **kwargs)
+        try:
+            request.user = await self.authenticate(request)
+            if handler is None:
+                raise exceptions.MethodNotAllowed(request.method)
+            return await handler(request, *args, **kwargs)
+        except (exceptions.APIException, Http404, PermissionDenied) as exc:
+            return self.handle_exception(exc)
+
+    async def authenticate(self, request):
+        # set by DRF's force_authenticate, which DRF's Request honours before any authenticator
+        forced = getattr(request, '_force_auth_user', None)
+        if forced is not None:
+            return forced
+
+        user = await request.auser()
+        if user.is_authenticated and user.is_active:
+            if request.method not in SAFE_METHODS:
+                SessionAuthentication().enforce_csrf(request)
+            return user
+
+        auth = request.headers.get('Authorization', '').split()
+        if auth and auth[0].lower() == 'basic':
+            if len(auth) != 2:
+                raise exceptions.AuthenticationFailed('Invalid basic header. No credentials provided.')
+            try:
+                username, _, password = base64.b64decode(auth[1]).decode().partition(':')
+            except (binascii.Error, UnicodeDecodeError):
+                raise exceptions.AuthenticationFailed('Invalid basic header. Credentials not correctly base64 encoded.')
+            user = await aauthenticate(request, username=username, password=password)
+            if user is None:
+                raise exceptions.AuthenticationFailed('Invalid username/password.')
+            if not user.is_active:
+                raise exceptions.AuthenticationFailed('User inactive or deleted.')
+            return user
+
+        raise exceptions.NotAuthenticated()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            # session authentication comes first, so DRF answers 403 without a challenge
+            exc.status_code = 403
+        response = exception_handler(exc, {})
+        return self.respond(response.data, status=response.status_code)
+
+    def parse(self, request):
+        if not request.body:
+            return {}
+        try:
+            data = json.loads(request.body)
+        except ValueError as exc:
+            raise exceptions.ParseError(f'JSON parse error - {exc}')
+        return data
+
+    def respond(self, data, status=200):
+        return HttpResponse(self.renderer.render(data), content_type=MEDIA_TYPE, status=status)
+
+
+class AsyncQuizReadView(AsyncAPIView):
+    """
+    GET of a view whose output depends only on one quiz, with the ETag and
+    response cache behaviour of QuizConditionalGetMixin and
+    QuizResponseCacheMixin; subclasses implement `get_data`.
+    """
+    quiz_lookup_url_kwarg = 'pk'
+    owner_flag_field = None
+
+    async def get(self, request, *args, **kwargs):
+        state = await quiz_state(kwargs[self.quiz_lookup_url_kwarg]).afirst()
+        if state is None:
+            return self.respond(await self.get_data(request, *args, **kwargs))
+
+        etag = quiz_etag(request, MEDIA_TYPE, state)
+        response = conditional_response(request, etag, state)
+        if response is None:
+            response = await self.get_cached(request, state, *args, **kwargs)
+        return patch_validators(response, etag, state)
+
+    async def get_cached(self, request, state, *args, **kwargs):
+        if not state['is_active']:
+            return self.respond(await self.get_data(request, *args, **kwargs))
+
+        cache_key = response_cache_key(request, MEDIA_TYPE, state)
+        body = await cache.aget(cache_key)
+        if body is None:
+            data = await self.get_data(request, *args, **kwargs)
+            shared = data
+            if self.owner_flag_field and data.get(self.owner_flag_field):
+                shared = {**data, self.owner_flag_field: False}
+            await cache.aset(cache_key, self.renderer.render(shared), settings.QUIZ_RESPONSE_CACHE_TIMEOUT)
+            return self.respond(data)
+
+        if self.owner_flag_field and state['owner_id'] == request.user.id:
+            body = set_owner_flag(body, self.owner_flag_field, self.renderer)
+        return HttpResponse(body, content_type=MEDIA_TYPE)
+
+
+def with_options(questions):
+    return questions.prefetch_related('options')
+
+
+class AsyncQuizDetailView(AsyncQuizReadView):
+    sync_view = QuizDetailAPIView
+    owner_flag_field = 'is_owner'
+
+    async def get_data(self, request, pk):
+        quiz = await aget_object_or_404(Quiz.objects.with_questions(), pk=pk)
+        return QuizSerializer(quiz, context={'request': request}).data
+
+
+class AsyncQuizQuestionDetailView(AsyncQuizReadView):
+    sync_view = QuizQuestionDetailAPIView
+    quiz_lookup_url_kwarg = 'quiz_id'
+
+    async def get_data(self, request, quiz_id, pk):
+        question = await aget_object_or_404(with_options(Question.objects.filter(quiz=quiz_id)), pk=pk)
+        return QuestionSerializer(question).data
+
+
+class AsyncQuizQuestionsListView(AsyncQuizReadView):
+    """Filtered and paginated by the sync view's filterset and pagination classes."""
+    sync_view = QuizQuestionsListAPIView
+    quiz_lookup_url_kwarg = 'quiz_id'
+
+    async def get_data(self, request, quiz_id):
+        questions = Question.objects.filter(quiz=quiz_id).order_by('pk')
+        filterset = self.sync_view.filterset_class(request.GET, queryset=questions, request=request)
+        if not filterset.is_valid():
+            raise exceptions.ValidationError(filterset.errors)
+        # Django's Paginator counts and slices synchronously
+        return await sync_to_async(self.paginate)(with_options(filterset.qs), Request(request))
+
+    def paginate(self, questions, request):
+        paginator = self.sync_view.pagination_class()
+        page = paginator.paginate_queryset(questions, request, view=self)
+        return paginator.get_paginated_response(QuestionSerializer(page, many=True).data).data
+
+
+class AsyncQuizStartView(AsyncAPIView):
+    async def post(self, request, pk):
+        quiz = await aget_object_or_404(Quiz.objects.only('title', 'content_version', 'sample_size'), id=pk)
+        attempt, created = await astart_attempt(quiz, request.user)
+        return self.respond(AttemptSerializer(attempt).data, status=201 if created else 200)
+
+
+class AsyncAttemptAnswersView(AsyncAPIView):
+    async def put(self, request, pk):
+        quiz = await aget_object_or_404(Quiz, id=pk)
+        data = self.parse(request)
+        if not isinstance(data, dict):
+            return self.respond({"error": "Expected an object."}, status=400)
+
+        # the row lock and upsert need a transaction, which only sync code can hold
+        try:
+            attempt, saved = await sync_to_async(autosave_answers)(quiz, request.user, data.get("answers", []))
+        except AttemptError as exc:
+            return self.respond({"error": str(exc)}, status=400)
+
+        return self.respond({"attempt_id": attempt.id, "saved": sorted(saved)})
+
+
+class AsyncQuizFinishView(AsyncAPIView):
+    async def post(self, request, pk):
+        quiz = await aget_object_or_404(Quiz, id=pk)
+        data = self.parse(request)
+        if not isinstance(data, dict):
+            return self.respond({"error": "Expected an object."}, status=400)
+        answers = data.get("answers", [])
+
+        if settings.QUIZ_DEFERRED_GRADING:
+            try:
+                attempt = await sync_to_async(submit_attempt)(quiz, request.user, answers)
+            except AttemptError as exc:
+                return self.respond({"error": str(exc)}, status=400)
+            return self.respond({"attempt_id": attempt.id, "status": "queued"}, status=202)
+
+        try:
+            attempt = await sync_to_async(finish_attempt)(quiz, request.user, answers)
+        except AttemptError as exc:
+            return self.respond({"error": str(exc)}, status=400)
+
+        return self.respond(AttemptSerializer(attempt).data)
@@ -0,0 +1,146 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .analytics import arecord_started_attempt, record_started_attempt
+from .grading import get_answer_key, save_answers, seal_attempt
+from .models import Attempt, GradingJob, UserAnswer
+from .sampling import adraw_questions, draw_questions
+
+
+class AttemptError(Exception):
+    pass
+
+
+def check_answer_data(answer_data):
+    # a submission that is not a list would be graded, or queued, as no answers
+    if not isinstance(answer_data, list):
+        raise AttemptError("Answers must be a list.")
+
+
+def open_attempt(quiz, user):
+    return Attempt.objects.filter(quiz=quiz, user=user, submitted_at__isnull=True, completed_at__isnull=True)
+
+
+def start_attempt(quiz, user, retries=3):
+    """
+    Return the user's open attempt for the quiz, creating it if needed.
+
+    The insert goes first and the attempt_one_open_per_user constraint
+    arbitrates concurrent starts; a loser reads the winner's attempt.
+    """
+    drawn = draw_questions(quiz)
+    for _ in range(retries):
+        try:
+            with transaction.atomic():
+                attempt = Attempt.objects.create(quiz=quiz, user=user, **drawn)
+                record_started_attempt(attempt)
+        except IntegrityError:
+            attempt = open_attempt(quiz, user).prefetch_related(
+                Prefetch('answers', queryset=UserAnswer.objects.select_related('question', 'select')),
+            ).first()
+            # the open attempt may have been finished in between, try again
+            if attempt is None:
+                continue
+            attempt.quiz = quiz
+            attempt.user = user
+            return attempt, False
+
+        # a new attempt has no answers, don't query for them
+        attempt._prefetched_objects_cache = {'answers': UserAnswer.objects.none()}
+        return attempt, True
+
+    raise IntegrityError('Could not start or resume an attempt.')
+
+
+async def astart_attempt(quiz, user, retries=3):
+    """
+    Async start_attempt for the ASGI views.
+
+    The async ORM cannot hold a transaction, so the open attempt is looked up
+    first and the insert runs in autocommit; attempt_one_open_per_user still
+    arbitrates the race between two first starts.
+    """
+    resumed = open_attempt(quiz, user).prefetch_related(
+        Prefetch('answers', queryset=UserAnswer.objects.select_related('question', 'select')),
+    )
+    for _ in range(retries):
+        attempt = await resumed.afirst()
+        if attempt is not None:
+            attempt.quiz = quiz
+            attempt.user = user
+            return attempt, False
+
+        try:
+            attempt = await Attempt.objects.acreate(quiz=quiz, user=user, **await adraw_questions(quiz))
+        except IntegrityError:
+            continue
+
+        await arecord_started_attempt(attempt)
+        attempt._prefetched_objects_cache = {'answers': UserAnswer.objects.none()}
+        return attempt, True
+
+    raise IntegrityError('Could not start or resume an attempt.')
+
+
+def autosave_answers(quiz, user, answer_data):
+    check_answer_data(answer_data)
+    with transaction.atomic():
+        attempt = open_attempt(quiz, user).select_for_update().first()
+
+        if not attempt:
+            raise AttemptError("No active attempts.")
+
+        if not answer_data:
+            raise AttemptError("No answer data.")
+
+        saved = save_answers(attempt, get_answer_key(quiz), answer_data)
+
+    return attempt, saved
+
+
+def finish_attempt(quiz, user, answer_data):
+    check_answer_data(answer_data)
+    with transaction.atomic():
+        attempt = open_attempt(quiz, user).select_for_update().first()
+
+        if not attempt:
+            raise AttemptError("No active attempts.")
+
+        attempt.quiz = quiz
+        attempt.user = user
+        answer_key = get_answer_key(quiz)
+
+        if answer_data:
+            save_answers(attempt, answer_key, answer_data)
+        elif not attempt.answers.exists():
+            raise AttemptError("No answer data.")
+
+        seal_attempt(attempt, answer_key)
+
+    return attempt
+
+
+def submit_attempt(quiz, user, answer_data):
+    """
+    Hand an open attempt in for deferred grading.
+
+    The submission is stored on a GradingJob in the same transaction that
+    closes the attempt to new answers, so an accepted submission is never
+    lost; run_grading_workers grades it later.
+    """
+    check_answer_data(answer_data)
+    with transaction.atomic():
+        attempt = open_attempt(quiz, user).select_for_update().first()
+
+        if not attempt:
+            raise AttemptError("No active attempts.")
+
+        if not answer_data and not attempt.answers.exists():
+            raise AttemptError("No answer data.")
+
+        attempt.submitted_at = timezone.now()
+        attempt.save(update_fields=['submitted_at'])
+        GradingJob.objects.create(attempt=attempt, answers=answer_data)
+
+    return attempt
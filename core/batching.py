@@ -0,0 +1,179 @@
+"""
+Batched edits to the questions and answer options of one quiz.
+
+A batch is a list of operations:
+
+    {"op": "create", "text": ..., "score": ..., "options": [{"answer": ..., "is_correct": ...}]}
+    {"op": "update", "id": <question id>, "text": ..., "score": ...}
+    {"op": "delete", "id": <question id>}
+    {"op": "create", "type": "option", "question_id": ..., "answer": ..., "is_correct": ...}
+    {"op": "update", "type": "option", "id": <option id>, "answer": ..., "is_correct": ...}
+    {"op": "delete", "type": "option", "id": <option id>}
+
+Every operation is validated before anything is written, and a batch with
+an invalid operation writes nothing.
+"""
+from django.db import transaction
+from django.db.models import F
+
+from .models import AnswerOption, Question, Quiz
+from .serializers import AnswerOptionSerializer, QuestionCreateSerializer, QuestionSerializer
+from .signals import defer_version_bumps
+
+MAX_OPERATIONS = 500
+OPS = ('create', 'update', 'delete')
+DONE = {'create': 'created', 'update': 'updated', 'delete': 'deleted'}
+TYPES = ('question', 'option')
+
+
+class BatchFailed(Exception):
+    def __init__(self, detail, results=None):
+        super().__init__(detail)
+        self.detail = detail
+        self.results = results
+
+
+def parse_id(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def apply_batch(quiz_id, operations, max_operations=MAX_OPERATIONS):
+    """
+    Apply a batch of operations to a quiz and return a result per operation.
+
+    The rows the batch targets are loaded with one query per type, the
+    writes run in one transaction with one bulk statement per kind of write,
+    and the quiz version is bumped once instead of once per row.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise BatchFailed('Operations must be a non-empty list.')
+    if len(operations) > max_operations:
+        raise BatchFailed(f'A batch takes at most {max_operations} operations.')
+    if not all(isinstance(operation, dict) for operation in operations):
+        raise BatchFailed('Each operation must be an object.')
+
+    question_ids, option_ids = set(), set()
+    for operation in operations:
+        if operation.get('type', 'question') == 'option':
+            option_ids.add(parse_id(operation.get('id')))
+            question_ids.add(parse_id(operation.get('question_id')))
+        else:
+            question_ids.add(parse_id(operation.get('id')))
+    question_ids.discard(None)
+    option_ids.discard(None)
+    questions = Question.objects.filter(quiz=quiz_id).in_bulk(question_ids) if question_ids else {}
+    options = AnswerOption.objects.filter(question__quiz=quiz_id).in_bulk(option_ids) if option_ids else {}
+
+    results, steps, targeted = [], [], set()
+    for index, operation in enumerate(operations):
+        result, step = validate(index, operation, questions, options, targeted)
+        results.append(result)
+        steps.append(step)
+
+    if any(result['status'] == 'invalid' for result in results):
+        for result in results:
+            if result['status'] == 'valid':
+                result['status'] = 'skipped'
+        raise BatchFailed('Invalid operations, nothing was saved.', results)
+
+    with transaction.atomic(), defer_version_bumps():
+        write(quiz_id, steps)
+
+    for result, (op, _, instance, _) in zip(results, steps):
+        result['id'] = instance.pk
+        result['status'] = DONE[op]
+    return results
+
+
+def validate(index, operation, questions, options, targeted):
+    op = operation.get('op')
+    kind = operation.get('type', 'question')
+    result = {'index': index, 'op': op, 'type': kind, 'id': operation.get('id'), 'status': 'valid'}
+
+    def invalid(errors):
+        result['status'] = 'invalid'
+        result['errors'] = errors
+        return result, None
+
+    if op not in OPS:
+        return invalid({'op': [f'Must be one of: {", ".join(OPS)}.']})
+    if kind not in TYPES:
+        return invalid({'type': [f'Must be one of: {", ".join(TYPES)}.']})
+
+    rows = questions if kind == 'question' else options
+    instance = None
+    if op != 'create':
+        instance = rows.get(parse_id(operation.get('id')))
+        if instance is None:
+            return invalid({'id': ['Not found in this quiz.']})
+        if (kind, instance.pk) in targeted:
+            return invalid({'id': ['Already changed earlier in this batch.']})
+        targeted.add((kind, instance.pk))
+
+    if op == 'delete':
+        return result, [op, kind, instance, None]
+
+    if kind == 'question':
+        if op == 'create':
+            serializer = QuestionCreateSerializer(data=operation)
+        else:
+            serializer = QuestionSerializer(instance, data=operation, partial=True)
+    else:
+        if op == 'create':
+            instance = questions.get(parse_id(operation.get('question_id')))
+            if instance is None:
+                return invalid({'question_id': ['Not found in this quiz.']})
+            serializer = AnswerOptionSerializer(data=operation)
+        else:
+            serializer = AnswerOptionSerializer(instance, data=operation, partial=True)
+
+    if not serializer.is_valid():
+        return invalid(serializer.errors)
+    return result, [op, kind, instance, serializer.validated_data]
+
+
+def write(quiz_id, steps):
+    new_questions, new_options = [], []
+    for step in steps:
+        op, kind, instance, data = step
+        if op != 'create':
+            continue
+        if kind == 'question':
+            question = Question(quiz_id=quiz_id, **{key: value for key, value in data.items() if key != 'options'})
+            new_questions.append(question)
+            new_options.extend(AnswerOption(question=question, **option) for option in data.get('options', []))
+            step[2] = question
+        else:
+            step[2] = AnswerOption(question=instance, **data)
+            new_options.append(step[2])
+    Question.objects.bulk_create(new_questions)
+    AnswerOption.objects.bulk_create(new_options)
+
+    for kind, model in (('question', Question), ('option', AnswerOption)):
+        updated, fields = [], set()
+        for op, step_kind, instance, data in steps:
+            if op == 'update' and step_kind == kind and data:
+                for field, value in data.items():
+                    setattr(instance, field, value)
+                fields.update(data)
+                updated.append(instance)
+        if updated:
+            model.objects.bulk_update(updated, sorted(fields))
+
+    deleted = {
+        kind: [instance.pk for op, step_kind, instance, _ in steps if op == 'delete' and step_kind == kind]
+        for kind in TYPES
+    }
+    if deleted['option']:
+        AnswerOption.objects.filter(pk__in=deleted['option']).delete()
+    if deleted['question']:
+        Question.objects.filter(pk__in=deleted['question']).delete()
+
+    Quiz.objects.filter(pk=quiz_id).bump_version(
+        questions_count=F('questions_count') + len(new_questions) - len(deleted['question']),
+    )
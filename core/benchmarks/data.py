@@ -0,0 +1,96 @@
+import random
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from core.analytics import rebuild_quiz_stats
+from core.grading import AnswerKey
+from core.leaderboard import rebuild_leaderboard
+from core.models import Attempt, Question, Quiz, UserAnswer
+
+OWNER = 'bench-owner'
+USER_PREFIX = 'bench-user-'
+QUIZ_PREFIX = 'Benchmark quiz '
+BATCH_SIZE = 5000
+
+
+def generate(quizzes=10, questions=20, options=4, users=1000, attempts=0, answers=False,
+             batch_size=BATCH_SIZE, seed=0, progress=None):
+    """
+    Seed `quizzes` x `questions` x `options` plus `users` and `attempts`.
+
+    Everything is inserted with bulk_create in batches of `batch_size`, one
+    transaction per batch, so millions of attempts fit in flat memory. The
+    first option of each question is the right one. With `answers` every
+    attempt gets an answer per question and a matching score; otherwise
+    only the score is drawn. Statistics and leaderboards are rebuilt at
+    the end, as bulk inserts skip the incremental bookkeeping.
+    """
+    rng = random.Random(seed)
+    owner, _ = User.objects.get_or_create(username=OWNER)
+
+    User.objects.bulk_create(
+        [User(username=f'{USER_PREFIX}{i}') for i in range(users)],
+        batch_size=batch_size, ignore_conflicts=True,
+    )
+    user_ids = list(User.objects.filter(username__startswith=USER_PREFIX).values_list('id', flat=True))
+
+    first = Quiz.objects.filter(title__startswith=QUIZ_PREFIX).count()
+    keys = []
+    for i in range(first, first + quizzes):
+        quiz = Quiz.objects.create(title=f'{QUIZ_PREFIX}{i}', description='', owner=owner, is_active=True)
+        Question.objects.bulk_create_with_options(quiz, [
+            {'text': f'Question {j}', 'score': 1 + j % 3, 'options': [
+                {'answer': f'Option {k}', 'is_correct': k == 0} for k in range(options)
+            ]}
+            for j in range(questions)
+        ])
+        quiz.refresh_from_db(fields=['content_version'])
+        keys.append((quiz, AnswerKey.compile(quiz)))
+    if progress:
+        progress('quizzes', len(keys))
+
+    by_question = []
+    for quiz, answer_key in keys:
+        question_options = {}
+        for option_id, (question_id, _, _) in sorted(answer_key.options.items()):
+            question_options.setdefault(question_id, []).append(option_id)
+        by_question.append(list(question_options.items()))
+
+    done = 0
+    while done < attempts and keys and user_ids:
+        size = min(batch_size, attempts - done)
+        rows = []
+        for _ in range(size):
+            index = rng.randrange(len(keys))
+            answer_key = keys[index][1]
+            if answers:
+                selected = [(question_id, rng.choice(option_ids)) for question_id, option_ids in by_question[index]]
+                score = answer_key.points(option_id for _, option_id in selected)
+            else:
+                selected = []
+                score = rng.randint(0, answer_key.max_score)
+            rows.append((keys[index][0], rng.choice(user_ids), score, selected))
+
+        with transaction.atomic():
+            now = timezone.now()
+            created = Attempt.objects.bulk_create([
+                Attempt(quiz=quiz, user_id=user_id, score=score, submitted_at=now, completed_at=now)
+                for quiz, user_id, score, _ in rows
+            ])
+            UserAnswer.objects.bulk_create([
+                UserAnswer(attempt=attempt, question_id=question_id, select_id=option_id)
+                for attempt, (_, _, _, selected) in zip(created, rows)
+                for question_id, option_id in selected
+            ], batch_size=batch_size)
+        done += size
+        if progress:
+            progress('attempts', done)
+
+    for quiz, answer_key in keys:
+        rebuild_quiz_stats(quiz, answer_key)
+        rebuild_leaderboard(quiz)
+
+    return {'quizzes': len(keys), 'questions': questions, 'options': options,
+            'users': len(user_ids), 'attempts': done, 'answers': answers}
@@ -0,0 +1,232 @@
+import asyncio
+import json
+import random
+import re
+import secrets
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+
+from django.conf import settings
+from django.test import AsyncClient, Client
+
+QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+class Result:
+    def __init__(self, status, data, queries):
+        self.status = status
+        self.data = data
+        # from the Server-Timing header of Quizzy.metrics, None when it is off
+        self.queries = queries
+
+
+def queries_from(server_timing):
+    match = QUERIES.search(server_timing or '')
+    return int(match.group(1)) if match else None
+
+
+class ClientTransport:
+    """Requests through the in-process WSGI handler, as the test client sends them."""
+
+    def __init__(self, session_key):
+        self.client = Client()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+
+    def request(self, method, path, body):
+        response = getattr(self.client, method)(path, body, content_type='application/json')
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        return Result(response.status_code, data, queries_from(response.get('Server-Timing')))
+
+
+class AsyncClientTransport:
+    """Requests through the in-process ASGI handler, for async views."""
+
+    def __init__(self, session_key):
+        self.client = AsyncClient()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+
+    async def request(self, method, path, body):
+        response = await getattr(self.client, method)(path, body, content_type='application/json')
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        return Result(response.status_code, data, queries_from(response.get('Server-Timing')))
+
+
+class HttpTransport:
+    """Requests to a running server, logged in with the session and a CSRF cookie."""
+
+    def __init__(self, base_url, session_key):
+        self.base_url = base_url
+        self.csrf_token = secrets.token_hex(16)
+        self.cookie = f'{settings.SESSION_COOKIE_NAME}={session_key}; {settings.CSRF_COOKIE_NAME}={self.csrf_token}'
+
+    def request(self, method, path, body):
+        request = urllib.request.Request(
+            urljoin(self.base_url, urlsplit(path)._replace(scheme='', netloc='').geturl()),
+            data=body.encode() if body is not None else None,
+            method=method.upper(),
+            headers={
+                'Accept': 'application/json',
+                'Content-Type': 'application/json',
+                'Cookie': self.cookie,
+                'X-CSRFToken': self.csrf_token,
+            },
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                status, headers, content = response.status, response.headers, response.read()
+        except urllib.error.HTTPError as exc:
+            status, headers, content = exc.code, exc.headers, exc.read()
+        try:
+            data = json.loads(content)
+        except ValueError:
+            data = None
+        return Result(status, data, queries_from(headers.get('Server-Timing')))
+
+
+def transport_factory(target):
+    if target == 'client':
+        return ClientTransport
+    return lambda session_key: HttpTransport(target, session_key)
+
+
+def run_scenario(scenario, context, make_transport, concurrency, seed=0):
+    """
+    Play `scenario` once for every session in the context, `concurrency` at a time.
+
+    Latency, status and query count are kept per request and summarized
+    overall and per step.
+    """
+    def play(index, session_key):
+        rng = random.Random(seed * 1_000_003 + index)
+        transport = make_transport(session_key)
+        samples = []
+        journey = scenario(context, rng)
+        try:
+            step = next(journey)
+            while True:
+                name, method, path, body = step
+                started = time.perf_counter()
+                try:
+                    result = transport.request(method, path, body)
+                except Exception:
+                    result = Result(None, None, None)
+                samples.append((name, time.perf_counter() - started, result.status, result.queries))
+                step = journey.send(result)
+        except StopIteration:
+            pass
+        return samples
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        users = pool.map(play, range(len(context.sessions)), context.sessions)
+        samples = [sample for user in users for sample in user]
+    return scenario_report(samples, time.perf_counter() - started)
+
+
+def arun_scenario(scenario, context, concurrency, seed=0):
+    """run_scenario through the ASGI handler, with `concurrency` users on one event loop."""
+    async def play(index, session_key, slots):
+        rng = random.Random(seed * 1_000_003 + index)
+        transport = AsyncClientTransport(session_key)
+        samples = []
+        journey = scenario(context, rng)
+        async with slots:
+            try:
+                step = next(journey)
+                while True:
+                    name, method, path, body = step
+                    started = time.perf_counter()
+                    try:
+                        result = await transport.request(method, path, body)
+                    except Exception:
+                        result = Result(None, None, None)
+                    samples.append((name, time.perf_counter() - started, result.status, result.queries))
+                    step = journey.send(result)
+            except StopIteration:
+                pass
+        return samples
+
+    async def users():
+        slots = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(*(
+            play(index, session_key, slots) for index, session_key in enumerate(context.sessions)
+        ))
+
+    started = time.perf_counter()
+    samples = [sample for user in asyncio.run(users()) for sample in user]
+    return scenario_report(samples, time.perf_counter() - started)
+
+
+def scenario_report(samples, seconds):
+    steps = {}
+    for sample in samples:
+        steps.setdefault(sample[0], []).append(sample)
+    return {
+        **summarize(samples, seconds),
+        'steps': {name: summarize(step_samples, seconds) for name, step_samples in sorted(steps.items())},
+    }
+
+
+def percentile(values, share):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+def summarize(samples, seconds):
+    latencies = [latency for _, latency, _, _ in samples]
+    queries = [count for _, _, _, count in samples if count is not None]
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for _, _, status, _ in samples if status is None or status >= 400),
+        'seconds': round(seconds, 4),
+        'throughput': round(len(samples) / seconds, 2) if seconds else 0.0,
+        'latency_ms': {
+            name: round(percentile(latencies, share) * 1000, 2)
+            for name, share in (('p50', 0.5), ('p90', 0.9), ('p95', 0.95), ('p99', 0.99), ('max', 1.0))
+        },
+        'queries': {
+            'mean': round(sum(queries) / len(queries), 2) if queries else None,
+            'max': max(queries) if queries else None,
+        },
+    }
+
+
+def compare(report, baseline):
+    """Relative change of the headline numbers per scenario, against an older report."""
+    changes = {}
+    for name, current in report['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        changes[name] = {
+            'throughput': change(previous['throughput'], current['throughput']),
+            'p99_ms': change(previous['latency_ms']['p99'], current['latency_ms']['p99']),
+            'queries_mean': change(previous['queries']['mean'], current['queries']['mean']),
+        }
+    return changes
+
+
+def change(before, after):
+    if not before or after is None:
+        return None
+    return round((after - before) / before, 4)
+
+
+def format_summary(label, summary):
+    """One line of a scenario summary, for terminal output."""
+    return (
+        f"{label:>14}  {summary['requests']} requests in {summary['seconds']:.2f}s  "
+        f"{summary['throughput']:.0f} req/s  p50 {summary['latency_ms']['p50']:.1f}ms  "
+        f"p99 {summary['latency_ms']['p99']:.1f}ms  errors {summary['errors']}"
+    )
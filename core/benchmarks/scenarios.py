@@ -0,0 +1,88 @@
+"""
+Scripted user journeys.
+
+A scenario is a generator taking the benchmark context and a random source.
+It yields `(step, method, path, body)` requests and is sent back the
+`Result` of each one, so later requests can follow cursors or attempt ids.
+"""
+import json
+
+from django.contrib.auth.models import User
+
+from core.loadtest import create_session
+from core.models import AnswerOption
+
+from .data import QUIZ_PREFIX, USER_PREFIX
+
+CATALOG_PAGES = 3
+AUTOSAVES = 3
+
+
+class Context:
+    def __init__(self, quizzes, sessions):
+        # [(quiz id, [(question id, [option ids])])], right option first
+        self.quizzes = quizzes
+        self.sessions = sessions
+
+
+def load_context(users):
+    """Read the seeded quizzes and log in the first `users` benchmark users."""
+    quizzes = {}
+    options = AnswerOption.objects.filter(
+        question__quiz__title__startswith=QUIZ_PREFIX,
+    ).order_by('question__quiz_id', 'question_id', 'id').values_list('question__quiz_id', 'question_id', 'id')
+    for quiz_id, question_id, option_id in options.iterator():
+        quizzes.setdefault(quiz_id, {}).setdefault(question_id, []).append(option_id)
+
+    accounts = User.objects.filter(username__startswith=USER_PREFIX).order_by('id')[:users]
+    sessions = [create_session(user) for user in accounts]
+
+    return Context([(quiz_id, list(questions.items())) for quiz_id, questions in quizzes.items()], sessions)
+
+
+def answers_for(questions, rng, share=1.0):
+    picked = questions if share >= 1 else rng.sample(questions, max(int(len(questions) * share), 1))
+    return [{'question_id': question_id, 'option_id': rng.choice(option_ids)} for question_id, option_ids in picked]
+
+
+def catalog(context, rng):
+    result = yield 'catalog', 'get', '/quizes/?view=summary&pagination=cursor', None
+    for _ in range(CATALOG_PAGES - 1):
+        next_url = result.data.get('next') if isinstance(result.data, dict) else None
+        if not next_url:
+            return
+        result = yield 'catalog', 'get', next_url, None
+
+
+def quiz(context, rng):
+    quiz_id, _ = rng.choice(context.quizzes)
+    yield 'quiz', 'get', f'/quizes/{quiz_id}/', None
+
+
+def start(context, rng):
+    quiz_id, _ = rng.choice(context.quizzes)
+    yield 'start', 'post', f'/quizes/{quiz_id}/start/', None
+
+
+def autosave(context, rng):
+    quiz_id, questions = rng.choice(context.quizzes)
+    yield 'start', 'post', f'/quizes/{quiz_id}/start/', None
+    for _ in range(AUTOSAVES):
+        body = json.dumps({'answers': answers_for(questions, rng, share=0.3)})
+        yield 'autosave', 'put', f'/quizes/{quiz_id}/attempt/answers/', body
+
+
+def finish(context, rng):
+    quiz_id, questions = rng.choice(context.quizzes)
+    yield 'start', 'post', f'/quizes/{quiz_id}/start/', None
+    yield 'finish', 'post', f'/quizes/{quiz_id}/finish/', json.dumps({'answers': answers_for(questions, rng)})
+
+
+SCENARIOS = {
+    'catalog': catalog,
+    'quiz': quiz,
+    'start': start,
+    'autosave': autosave,
+    'finish': finish,
+}
+
@@ -0,0 +1,148 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.compat import LONG_SEPARATORS, SHORT_SEPARATORS
+
+from .models import Quiz
+
+STATE_FIELDS = ('id', 'owner_id', 'is_active', 'content_version', 'updated_at')
+
+
+class LocalLRU:
+    """
+    A per-process mapping that keeps its `maxsize` most recently used items,
+    for values that are too hot to fetch from the shared cache every time.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+def quiz_state(quiz_id):
+    return Quiz.objects.filter(pk=quiz_id).values(*STATE_FIELDS)
+
+
+def variant_digest(request, media_type, *parts):
+    variant = '|'.join([request.build_absolute_uri(), media_type, *parts])
+    return hashlib.sha1(variant.encode()).hexdigest()[:16]
+
+
+def quiz_etag(request, media_type, state):
+    digest = variant_digest(request, media_type, str(state['owner_id'] == request.user.id))
+    return f'"{state["id"]}-{state["content_version"]}-{digest}"'
+
+
+def conditional_response(request, etag, state):
+    return get_conditional_response(request, etag=etag, last_modified=int(state['updated_at'].timestamp()))
+
+
+def patch_validators(response, etag, state):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(int(state['updated_at'].timestamp()))
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def response_cache_key(request, media_type, state):
+    digest = variant_digest(request, media_type)
+    return f'quiz-response:{state["id"]}:{state["content_version"]}:{digest}'
+
+
+def set_owner_flag(body, field, renderer):
+    """Turn `field` on in a body the JSON `renderer` rendered without indentation."""
+    separators = SHORT_SEPARATORS if renderer.compact else LONG_SEPARATORS
+    flag = f'"{field}"{separators[1]}'.encode()
+    return body.replace(flag + b'false', flag + b'true', 1)
+
+
+class QuizStateMixin:
+    quiz_lookup_url_kwarg = 'pk'
+
+    def get_quiz_state(self):
+        if not hasattr(self, '_quiz_state'):
+            self._quiz_state = quiz_state(self.kwargs[self.quiz_lookup_url_kwarg]).first()
+        return self._quiz_state
+
+
+class QuizConditionalGetMixin(QuizStateMixin):
+    """
+    Answers conditional GETs for views whose output depends only on a quiz.
+
+    Validators come from Quiz.content_version and Quiz.updated_at, which the
+    signals in core.signals bump on every quiz, question and option write, so
+    a revalidation is one primary key lookup and never touches the serializer.
+    """
+
+    def get(self, request, *args, **kwargs):
+        state = self.get_quiz_state()
+        if state is None:
+            return super().get(request, *args, **kwargs)
+
+        etag = quiz_etag(request, request.accepted_media_type, state)
+        response = conditional_response(request, etag, state)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return patch_validators(response, etag, state)
+
+
+class QuizResponseCacheMixin(QuizStateMixin):
+    """
+    Caches the rendered JSON of active quizzes in the Django cache.
+
+    Keys include the quiz content_version, so a write to the quiz, one of its
+    questions or options moves that quiz to fresh keys and leaves every other
+    quiz's entries alone. The body is stored as a non-owner sees it and
+    `owner_flag_field` is patched in per request.
+    """
+    owner_flag_field = None
+    cached_media_type = 'application/json'
+
+    def get(self, request, *args, **kwargs):
+        state = self.get_quiz_state()
+        if state is None or not state['is_active'] or request.accepted_media_type != self.cached_media_type:
+            return super().get(request, *args, **kwargs)
+
+        cache_key = response_cache_key(request, self.cached_media_type, state)
+        body = cache.get(cache_key)
+        if body is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code == 200:
+                data = response.data
+                if self.owner_flag_field and data.get(self.owner_flag_field):
+                    data = {**data, self.owner_flag_field: False}
+                body = request.accepted_renderer.render(data, request.accepted_media_type, self.get_renderer_context())
+                cache.set(cache_key, body, settings.QUIZ_RESPONSE_CACHE_TIMEOUT)
+            return response
+
+        if self.owner_flag_field and state['owner_id'] == request.user.id:
+            body = set_owner_flag(body, self.owner_flag_field, request.accepted_renderer)
+        return HttpResponse(body, content_type=self.cached_media_type)
@@ -0,0 +1,121 @@
+import csv
+import datetime
+import json
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Attempt, UserAnswer
+
+ATTEMPT_BATCH_SIZE = 500
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+ATTEMPT_COLUMNS = [
+    ('attempt_id', 'id'),
+    ('quiz_id', 'quiz_id'),
+    ('user_id', 'user_id'),
+    ('username', 'user__username'),
+    ('started_at', 'started_at'),
+    ('completed_at', 'completed_at'),
+    ('score', 'score'),
+]
+ANSWER_COLUMNS = [
+    ('question_id', 'question_id'),
+    ('option_id', 'select_id'),
+    ('is_correct', 'select__is_correct'),
+]
+
+
+def parse_moment(value):
+    """Parse an ISO date or datetime, raising ValueError on garbage."""
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Invalid date: {value}')
+        moment = datetime.datetime.combine(day, datetime.time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def filter_attempts(quiz_id=None, since=None, until=None):
+    attempts = Attempt.objects.all()
+    if quiz_id is not None:
+        attempts = attempts.filter(quiz_id=quiz_id)
+    if since is not None:
+        attempts = attempts.filter(started_at__gte=since)
+    if until is not None:
+        attempts = attempts.filter(started_at__lt=until)
+    return attempts
+
+
+def iter_attempt_batches(attempts, batch_size=ATTEMPT_BATCH_SIZE):
+    """
+    Walk attempts by primary key in batches.
+
+    Each batch is its own short query, so an export of any size holds
+    neither a long transaction nor more than one batch in memory.
+    """
+    fields = [field for _, field in ATTEMPT_COLUMNS]
+    last_id = 0
+    while True:
+        batch = list(attempts.filter(id__gt=last_id).order_by('id').values_list(*fields)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1][0]
+
+
+def iter_attempt_rows(attempts):
+    for batch in iter_attempt_batches(attempts):
+        yield from batch
+
+
+def iter_answer_rows(attempts):
+    fields = ['attempt_id'] + [field for _, field in ANSWER_COLUMNS]
+    for batch in iter_attempt_batches(attempts):
+        by_id = {row[0]: row for row in batch}
+        answers = UserAnswer.objects.filter(attempt_id__in=by_id).order_by('attempt_id', 'question_id')
+        for attempt_id, *answer in answers.values_list(*fields):
+            yield by_id[attempt_id] + tuple(answer)
+
+
+def export_rows(kind, attempts):
+    if kind == 'answers':
+        return [name for name, _ in ATTEMPT_COLUMNS + ANSWER_COLUMNS], iter_answer_rows(attempts)
+    return [name for name, _ in ATTEMPT_COLUMNS], iter_attempt_rows(attempts)
+
+
+def serialize_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def render_csv(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow([serialize_value(value) for value in row])
+
+
+def render_jsonl(header, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(header, map(serialize_value, row)))) + '\n'
+
+
+def render(output_format, header, rows):
+    if output_format == 'jsonl':
+        return render_jsonl(header, rows)
+    return render_csv(header, rows)
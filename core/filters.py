@@ -1,9 +1,15 @@
 import django_filters
 from .models import Question
+from .search import search_questions
 class QuestionsFilter(django_filters.rest_framework.FilterSet):
+    search = django_filters.CharFilter(method='filter_search')
+
     class Meta:
         model = Question
         fields = {
             'text': ['iexact','icontains'],
             'score': ['exact','gt','gte','lt','lte','range'],
-        }
\ No newline at end of file
+        }
+
+    def filter_search(self, queryset, name, value):
+        return search_questions(queryset, value)
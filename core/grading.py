@@ -0,0 +1,182 @@
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .analytics import record_completed_attempt
+from .caching import LocalLRU
+from .leaderboard import record_attempt as record_leaderboard_attempt
+from .models import AnswerOption, Attempt, UserAnswer
+
+ANSWER_KEY_TIMEOUT = 60 * 60 * 24
+ANSWER_KEYS_KEPT = 256
+
+
+def parse_answers(answer_data):
+    selected = []
+    for answer in answer_data:
+        try:
+            selected.append((int(answer["question_id"]), int(answer["option_id"])))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return selected
+
+
+class AnswerKey:
+    def __init__(self, quiz_id, version, options):
+        self.quiz_id = quiz_id
+        self.version = version
+        # option id -> (question id, is correct, points)
+        self.options = options
+        self._best_points = None
+
+    @classmethod
+    def compile(cls, quiz):
+        rows = AnswerOption.objects.filter(
+            question__quiz_id=quiz.id,
+        ).values_list('id', 'question_id', 'is_correct', 'question__score')
+        options = {option_id: (question_id, is_correct, points)
+                   for option_id, question_id, is_correct, points in rows}
+        return cls(quiz.id, quiz.content_version, options)
+
+    def resolve(self, selected):
+        resolved = {}
+        for question_id, option_id in selected:
+            option = self.options.get(option_id)
+            if option is None or option[0] != question_id:
+                continue
+            # the last valid answer for a question wins, as with update_or_create
+            resolved[question_id] = (option_id, option[1], option[2])
+        return resolved
+
+    @property
+    def best_points(self):
+        """Question id -> the points of its best correct option."""
+        if self._best_points is None:
+            best = {}
+            for question_id, is_correct, points in self.options.values():
+                if is_correct:
+                    best[question_id] = max(best.get(question_id, 0), points)
+            self._best_points = best
+        return self._best_points
+
+    def max_score_of(self, question_ids=None):
+        """The most an attempt asked `question_ids`, all questions when None, can score."""
+        if question_ids is None:
+            return sum(self.best_points.values())
+        return sum(self.best_points.get(question_id, 0) for question_id in question_ids)
+
+    def pass_score_of(self, question_ids=None):
+        return math.ceil(self.max_score_of(question_ids) * settings.QUIZ_PASS_RATIO)
+
+    @property
+    def max_score(self):
+        return self.max_score_of()
+
+    @property
+    def pass_score(self):
+        return self.pass_score_of()
+
+    def points(self, option_ids):
+        total = 0
+        for option_id in option_ids:
+            option = self.options.get(option_id)
+            if option is not None and option[1]:
+                total += option[2]
+        return total
+
+
+# the answer keys of the quizzes this process graded most recently
+_answer_keys = LocalLRU(ANSWER_KEYS_KEPT)
+
+
+def get_answer_key(quiz):
+    answer_key = _answer_keys.get(quiz.id)
+    if answer_key is not None and answer_key.version == quiz.content_version:
+        return answer_key
+
+    cache_key = f'answer-key:{quiz.id}:{quiz.content_version}'
+    options = cache.get(cache_key)
+    if options is None:
+        answer_key = AnswerKey.compile(quiz)
+        cache.set(cache_key, answer_key.options, ANSWER_KEY_TIMEOUT)
+    else:
+        answer_key = AnswerKey(quiz.id, quiz.content_version, options)
+
+    _answer_keys[quiz.id] = answer_key
+    return answer_key
+
+
+def save_answers(attempt, answer_key, answer_data):
+    """
+    Upsert the valid answers of a submission into an open attempt.
+
+    Attempt.score is kept as a running total while the attempt is open:
+    only the difference between the new selections and the ones they
+    replace is added to it. seal_attempt recounts it from the stored answers. Answers to
+    questions outside the attempt's draw are ignored.
+    """
+    selected = parse_answers(answer_data)
+    if attempt.question_ids is not None:
+        drawn = set(attempt.question_ids)
+        selected = [(question_id, option_id) for question_id, option_id in selected if question_id in drawn]
+    resolved = answer_key.resolve(selected)
+    if not resolved:
+        return resolved
+
+    with transaction.atomic(savepoint=False):
+        replaced = UserAnswer.objects.filter(
+            attempt=attempt,
+            question_id__in=resolved.keys(),
+        ).values_list('select_id', flat=True)
+        delta = (sum(points for _, is_correct, points in resolved.values() if is_correct)
+                 - answer_key.points(replaced))
+
+        UserAnswer.objects.bulk_create(
+            [UserAnswer(attempt=attempt, question_id=question_id, select_id=option_id)
+             for question_id, (option_id, _, _) in resolved.items()],
+            update_conflicts=True,
+            unique_fields=['attempt', 'question'],
+            update_fields=['select'],
+        )
+
+        if delta:
+            Attempt.objects.filter(pk=attempt.pk).update(score=F('score') + delta)
+            attempt.score += delta
+    return resolved
+
+
+def result_snapshot(attempt, answers):
+    """
+    The graded attempt's quiz title, user and answers as AttemptSerializer
+    shows them, so reads don't follow the answers' relations and later edits
+    to the quiz don't rewrite past results.
+    """
+    return {
+        'quiz_title': attempt.quiz.title,
+        'user_username': attempt.user.username,
+        'answers': [
+            {
+                'question_text': answer.question.text,
+                'selected_answer': answer.select.answer,
+                'is_correct': answer.select.is_correct,
+            }
+            for answer in answers
+        ],
+    }
+
+
+def seal_attempt(attempt, answer_key):
+    answers = list(UserAnswer.objects.filter(attempt=attempt).select_related('question', 'select'))
+    attempt.completed_at = timezone.now()
+    attempt.submitted_at = attempt.submitted_at or attempt.completed_at
+    # the running total may count options that were edited or deleted since they were picked
+    attempt.score = sum(answer.question.score for answer in answers if answer.select.is_correct)
+    attempt.result = result_snapshot(attempt, answers)
+    attempt.save(update_fields=['submitted_at', 'completed_at', 'score', 'result'])
+    record_completed_attempt(attempt, answer_key)
+    record_leaderboard_attempt(attempt)
+    return attempt
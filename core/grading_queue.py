@@ -0,0 +1,114 @@
+import datetime
+import os
+import uuid
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .grading import get_answer_key, save_answers, seal_attempt
+from .models import Attempt, GradingJob
+
+BATCH_SIZE = 50
+LEASE_SECONDS = 60
+MAX_TRIES = 3
+
+
+def expired(now):
+    # running jobs whose worker died or let the lease run out
+    return Q(status=GradingJob.STATUS_RUNNING, locked_until__lt=now)
+
+
+def claimable(now, max_tries=MAX_TRIES):
+    return Q(status=GradingJob.STATUS_QUEUED) | (expired(now) & Q(tries__lt=max_tries))
+
+
+def fail_exhausted(now, max_tries=MAX_TRIES):
+    """Fail expired jobs that were already tried `max_tries` times."""
+    return GradingJob.objects.filter(expired(now), tries__gte=max_tries).update(
+        status=GradingJob.STATUS_FAILED, locked_until=None, error='The lease ran out on every try.', updated_at=now,
+    )
+
+
+def claim_jobs(batch_size=BATCH_SIZE, lease_seconds=LEASE_SECONDS, max_tries=MAX_TRIES):
+    """
+    Lease up to `batch_size` jobs to this worker.
+
+    The lease is taken with a conditional UPDATE under a fresh token, so two
+    workers racing for the same rows each get only the rows their own update
+    matched. A job whose lease ran out `max_tries` times, for instance because
+    it keeps killing its worker, is failed instead of claimed again.
+    """
+    now = timezone.now()
+    fail_exhausted(now, max_tries)
+    candidates = list(GradingJob.objects.filter(claimable(now, max_tries)).values_list('id', flat=True)[:batch_size])
+    if not candidates:
+        return '', []
+
+    token = f'{os.getpid()}:{uuid.uuid4().hex}'
+    GradingJob.objects.filter(claimable(now, max_tries), id__in=candidates).update(
+        status=GradingJob.STATUS_RUNNING,
+        locked_by=token,
+        locked_until=now + datetime.timedelta(seconds=lease_seconds),
+        tries=F('tries') + 1,
+        updated_at=now,
+    )
+    jobs = GradingJob.objects.filter(locked_by=token).select_related('attempt__quiz')
+    return token, list(jobs)
+
+
+def grade_job(job, token):
+    """
+    Grade one leased job.
+
+    Marking the job done and writing the grade share a transaction, and the
+    done mark only applies while this worker still holds the lease, so a crash
+    rolls both back and a lease that ran out leaves the job to its new holder.
+    """
+    with transaction.atomic():
+        attempt = Attempt.objects.select_for_update().select_related('quiz', 'user').get(pk=job.attempt_id)
+        if not GradingJob.objects.filter(pk=job.pk, locked_by=token, status=GradingJob.STATUS_RUNNING).update(
+            status=GradingJob.STATUS_DONE, locked_until=None, error='', updated_at=timezone.now(),
+        ):
+            return False
+
+        if attempt.completed_at is None:
+            answer_key = get_answer_key(attempt.quiz)
+            save_answers(attempt, answer_key, job.answers)
+            seal_attempt(attempt, answer_key)
+    return True
+
+
+def release_job(job, token, error, max_tries=MAX_TRIES):
+    status = GradingJob.STATUS_FAILED if job.tries >= max_tries else GradingJob.STATUS_QUEUED
+    GradingJob.objects.filter(pk=job.pk, locked_by=token, status=GradingJob.STATUS_RUNNING).update(
+        status=status, locked_until=None, error=error, updated_at=timezone.now(),
+    )
+
+
+def run_batch(batch_size=BATCH_SIZE, lease_seconds=LEASE_SECONDS, max_tries=MAX_TRIES):
+    """Claim and grade one batch, returning the number of jobs claimed."""
+    token, jobs = claim_jobs(batch_size, lease_seconds, max_tries)
+    for job in jobs:
+        try:
+            grade_job(job, token)
+        except Exception as exc:
+            release_job(job, token, str(exc), max_tries)
+    return len(jobs)
+
+
+def requeue_failed():
+    return GradingJob.objects.filter(status=GradingJob.STATUS_FAILED).update(
+        status=GradingJob.STATUS_QUEUED, tries=0, updated_at=timezone.now(),
+    )
+
+
+def attempt_status(attempt):
+    if attempt.completed_at is not None:
+        return 'completed'
+    if attempt.submitted_at is None:
+        return 'open'
+    job = getattr(attempt, 'grading_job', None)
+    if job is not None and job.status == GradingJob.STATUS_FAILED:
+        return 'failed'
+    return 'queued'
@@ -0,0 +1,141 @@
+import json
+
+from django.db import transaction
+
+from .models import ImportJob, Question, Quiz
+from .serializers import QuestionCreateSerializer, QuizCreateSerializer
+
+CHUNK_SIZE = 500
+READ_SIZE = 64 * 1024
+
+
+class ImportFailed(Exception):
+    def __init__(self, job, detail):
+        super().__init__(detail)
+        self.job = job
+        self.detail = detail
+
+
+def iter_records(stream, read_size=READ_SIZE):
+    """
+    Yield quiz records from a text stream without reading it whole.
+
+    Accepts a JSON array of quizzes, a single quiz object or JSON Lines.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    in_array = None
+
+    while True:
+        buffer = buffer.lstrip()
+        if in_array:
+            buffer = buffer.lstrip(',').lstrip()
+            if buffer.startswith(']'):
+                return
+        elif in_array is None and buffer:
+            in_array = buffer.startswith('[')
+            if in_array:
+                buffer = buffer[1:]
+            continue
+
+        if buffer:
+            try:
+                record, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # a value ending exactly at the buffer edge may be a truncated number or literal
+                if end < len(buffer) or eof or isinstance(record, (dict, list, str)):
+                    buffer = buffer[end:]
+                    yield record
+                    continue
+
+        if eof:
+            if buffer:
+                raise json.JSONDecodeError('Unexpected data', buffer, 0)
+            return
+        data = stream.read(read_size)
+        if not data:
+            eof = True
+        buffer += data
+
+
+def chunks(items, size, start=0):
+    for offset in range(start, len(items), size):
+        yield offset, items[offset:offset + size]
+
+
+def run_import(records, owner, job=None, source='', chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Import quiz records, committing one chunk of questions per transaction.
+
+    Progress is saved on the ImportJob in the same transaction as the rows it
+    describes, so passing the job of a failed run back in with the same input
+    skips everything that was already committed.
+    """
+    if job is None:
+        job = ImportJob.objects.create(owner=owner, source=source[:255])
+    elif job.status != ImportJob.STATUS_RUNNING:
+        job.status = ImportJob.STATUS_RUNNING
+        job.error = ''
+        job.save(update_fields=['status', 'error', 'updated_at'])
+
+    try:
+        for index, record in enumerate(records):
+            if index < job.records_done:
+                continue
+            import_record(job, record, chunk_size, progress)
+    except ImportFailed:
+        raise
+    except Exception as exc:
+        raise ImportFailed(fail(job, str(exc)), str(exc)) from exc
+
+    job.status = ImportJob.STATUS_COMPLETED
+    job.save(update_fields=['status', 'updated_at'])
+    return job
+
+
+def import_record(job, record, chunk_size, progress):
+    if not isinstance(record, dict):
+        raise ImportFailed(fail(job, 'Each record must be a quiz object.'), {'record': job.records_done})
+
+    if job.current_quiz_id is None:
+        header = {key: value for key, value in record.items() if key != 'questions'}
+        serializer = QuizCreateSerializer(data=header)
+        if not serializer.is_valid():
+            raise ImportFailed(fail(job, serializer.errors), {'record': job.records_done, 'errors': serializer.errors})
+        with transaction.atomic():
+            job.current_quiz = Quiz.objects.create(owner=job.owner, **serializer.validated_data)
+            job.questions_done = 0
+            job.save(update_fields=['current_quiz', 'questions_done', 'updated_at'])
+
+    questions = record.get('questions') or []
+    for offset, chunk in chunks(questions, chunk_size, start=job.questions_done):
+        serializer = QuestionCreateSerializer(data=chunk, many=True)
+        if not serializer.is_valid():
+            errors = serializer.errors
+            items = errors.items() if isinstance(errors, dict) else enumerate(errors)
+            errors = {offset + i: error for i, error in items if error}
+            raise ImportFailed(fail(job, errors), {'record': job.records_done, 'errors': errors})
+        with transaction.atomic():
+            Question.objects.bulk_create_with_options(job.current_quiz, serializer.validated_data)
+            job.questions_done = offset + len(chunk)
+            job.save(update_fields=['questions_done', 'updated_at'])
+        if progress:
+            progress(job)
+
+    job.records_done += 1
+    job.current_quiz = None
+    job.questions_done = 0
+    job.save(update_fields=['records_done', 'current_quiz', 'questions_done', 'updated_at'])
+    if progress:
+        progress(job)
+
+
+def fail(job, error):
+    job.status = ImportJob.STATUS_FAILED
+    job.error = error if isinstance(error, str) else json.dumps(error, default=str)
+    job.save(update_fields=['status', 'error', 'updated_at'])
+    return job
@@ -0,0 +1,162 @@
+import datetime
+import operator
+from collections import Counter, defaultdict
+from functools import reduce
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import Attempt, LeaderboardBucket, LeaderboardEntry, LeaderboardTimeBucket
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+# ties on a score are bucketed by the UTC day, hour, minute and second they were completed in,
+# each span nested in the one before it
+SPANS = {
+    LeaderboardTimeBucket.SPAN_DAY: {'hour': 0, 'minute': 0, 'second': 0, 'microsecond': 0},
+    LeaderboardTimeBucket.SPAN_HOUR: {'minute': 0, 'second': 0, 'microsecond': 0},
+    LeaderboardTimeBucket.SPAN_MINUTE: {'second': 0, 'microsecond': 0},
+    LeaderboardTimeBucket.SPAN_SECOND: {'microsecond': 0},
+}
+
+
+def starts_of(completed_at):
+    """The UTC start of each span `completed_at` falls in."""
+    completed_at = completed_at.astimezone(datetime.timezone.utc)
+    return {span: completed_at.replace(**fields) for span, fields in SPANS.items()}
+
+
+def buckets_of(quiz_id, score, completed_at):
+    """The bucket keys an entry is counted in, per score and per score and span."""
+    return [(LeaderboardBucket, {'quiz_id': quiz_id, 'score': score})] + [
+        (LeaderboardTimeBucket, {'quiz_id': quiz_id, 'score': score, 'span': span, 'start': start})
+        for span, start in starts_of(completed_at).items()
+    ]
+
+
+def shift_buckets(buckets, delta):
+    """Add `delta` to the entry counts of (model, key) buckets, creating missing ones when adding."""
+    keys = defaultdict(list)
+    for model, key in buckets:
+        keys[model].append(key)
+    for model, model_keys in keys.items():
+        if delta > 0:
+            model.objects.bulk_create([model(**key) for key in model_keys], ignore_conflicts=True)
+        model.objects.filter(reduce(operator.or_, (Q(**key) for key in model_keys))).update(
+            entries_count=F('entries_count') + delta,
+        )
+
+
+def is_better(attempt, entry):
+    # higher score wins, an equal score keeps whoever finished first
+    if attempt.score != entry.score:
+        return attempt.score > entry.score
+    return (attempt.completed_at, attempt.id) < (entry.completed_at, entry.attempt_id)
+
+
+def record_attempt(attempt):
+    """Keep each user's best completed attempt on the quiz leaderboard."""
+    with transaction.atomic(savepoint=False):
+        entry = LeaderboardEntry.objects.select_for_update().filter(
+            quiz_id=attempt.quiz_id, user_id=attempt.user_id,
+        ).first()
+
+        if entry is None:
+            LeaderboardEntry.objects.create(
+                quiz_id=attempt.quiz_id,
+                user_id=attempt.user_id,
+                attempt=attempt,
+                score=attempt.score,
+                completed_at=attempt.completed_at,
+            )
+            shift_buckets(buckets_of(attempt.quiz_id, attempt.score, attempt.completed_at), 1)
+            return
+
+        if not is_better(attempt, entry):
+            return
+
+        moves = [
+            (old, new) for old, new in zip(
+                buckets_of(entry.quiz_id, entry.score, entry.completed_at),
+                buckets_of(attempt.quiz_id, attempt.score, attempt.completed_at),
+            )
+            if old != new
+        ]
+        shift_buckets([old for old, _ in moves], -1)
+        shift_buckets([new for _, new in moves], 1)
+        entry.attempt = attempt
+        entry.score = attempt.score
+        entry.completed_at = attempt.completed_at
+        entry.save(update_fields=['attempt', 'score', 'completed_at'])
+
+
+def top(quiz_id, limit=DEFAULT_LIMIT):
+    entries = LeaderboardEntry.objects.filter(quiz_id=quiz_id).select_related('user')[:limit]
+    return [(rank, entry) for rank, entry in enumerate(entries, start=1)]
+
+
+def rank_of(quiz_id, score, completed_at, attempt_id):
+    """
+    1-based rank of a (score, completed_at, attempt) position.
+
+    Entries with a higher score are summed from the per-score buckets. Ties
+    completed before it are summed from the span buckets: earlier days,
+    then earlier hours of its day, minutes of its hour and seconds of its
+    minute, so the rank index is only counted over ties completed earlier
+    in the same second. A lookup reads at most one bucket per score, one per
+    day the score spans plus 23 + 59 + 59 span buckets, and the ties of one
+    second, however many entries finished in the same exam window.
+    """
+    starts = starts_of(completed_at)
+    higher = LeaderboardBucket.objects.filter(
+        quiz_id=quiz_id, score__gt=score,
+    ).aggregate(total=Sum('entries_count'))['total'] or 0
+
+    spans = list(starts)
+    earlier = Q(span=spans[0], start__lt=starts[spans[0]])
+    for parent, span in zip(spans, spans[1:]):
+        earlier |= Q(span=span, start__gte=starts[parent], start__lt=starts[span])
+    earlier_ties = LeaderboardTimeBucket.objects.filter(
+        earlier, quiz_id=quiz_id, score=score,
+    ).aggregate(total=Sum('entries_count'))['total'] or 0
+
+    same_second = LeaderboardEntry.objects.filter(
+        quiz_id=quiz_id, score=score, completed_at__gte=starts[spans[-1]],
+    ).filter(
+        Q(completed_at__lt=completed_at) | Q(completed_at=completed_at, attempt_id__lt=attempt_id),
+    ).count()
+    return higher + earlier_ties + same_second + 1
+
+
+def rebuild_leaderboard(quiz):
+    with transaction.atomic():
+        LeaderboardEntry.objects.filter(quiz=quiz).delete()
+        LeaderboardBucket.objects.filter(quiz=quiz).delete()
+        LeaderboardTimeBucket.objects.filter(quiz=quiz).delete()
+
+        best = {}
+        completed = Attempt.objects.filter(quiz=quiz, completed_at__isnull=False).order_by(
+            'user_id', '-score', 'completed_at', 'id',
+        ).values_list('id', 'user_id', 'score', 'completed_at')
+        for attempt_id, user_id, score, completed_at in completed.iterator():
+            best.setdefault(user_id, LeaderboardEntry(
+                quiz=quiz, user_id=user_id, attempt_id=attempt_id, score=score, completed_at=completed_at,
+            ))
+        LeaderboardEntry.objects.bulk_create(best.values(), batch_size=1000)
+
+        LeaderboardBucket.objects.bulk_create([
+            LeaderboardBucket(quiz=quiz, score=row['score'], entries_count=row['total'])
+            for row in LeaderboardEntry.objects.filter(quiz=quiz).order_by().values('score').annotate(
+                total=Count('id'),
+            )
+        ])
+
+        spans = Counter(
+            (entry.score, span, start)
+            for entry in best.values() for span, start in starts_of(entry.completed_at).items()
+        )
+        LeaderboardTimeBucket.objects.bulk_create([
+            LeaderboardTimeBucket(quiz=quiz, score=score, span=span, start=start, entries_count=total)
+            for (score, span, start), total in spans.items()
+        ], batch_size=1000)
@@ -0,0 +1,35 @@
+import contextlib
+import os
+
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+
+@contextlib.contextmanager
+def scratch_database():
+    """Run the block against a freshly migrated test database."""
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    test_name = connection.settings_dict['NAME']
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        if connection.vendor == 'sqlite':
+            # worker threads may not have closed their connections, drop the WAL files too
+            for suffix in ('-wal', '-shm'):
+                with contextlib.suppress(OSError):
+                    os.remove(f'{test_name}{suffix}')
+
+
+def create_session(user):
+    """Log `user` in without a password check and return the session key."""
+    session = SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    return session.session_key
@@ -0,0 +1,115 @@
+import contextlib
+import json
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from core import loadtest
+from core.benchmarks.data import generate
+from core.benchmarks.runner import compare, run_scenario, transport_factory
+from core.benchmarks.scenarios import SCENARIOS, load_context
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed benchmark data and run scripted scenarios (catalog, quiz, start, autosave, '
+        'finish) through the test client or against a running server, reporting '
+        'throughput, latency percentiles and queries per request as JSON. By default '
+        'everything runs on a throwaway test database; --database current uses the '
+        'configured one, which --target <url> needs so the server sees the data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append',
+                            help='Scenario to run (repeatable, default: all in journey order).')
+        parser.add_argument('--target', default='client',
+                            help="'client' for the in-process test client, or a server URL.")
+        parser.add_argument('--database', choices=['scratch', 'current'], default='scratch')
+        parser.add_argument('--users', type=int, default=200, help='Virtual users per scenario.')
+        parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight.')
+        parser.add_argument('--random-seed', type=int, default=0)
+
+        seeding = parser.add_argument_group('data generator')
+        seeding.add_argument('--seed', action='store_true',
+                             help='Seed the current database before running (always done on scratch).')
+        seeding.add_argument('--seed-only', action='store_true', help='Seed and exit.')
+        seeding.add_argument('--quizzes', type=int, default=10)
+        seeding.add_argument('--questions', type=int, default=20, help='Questions per quiz.')
+        seeding.add_argument('--options', type=int, default=4, help='Options per question.')
+        seeding.add_argument('--attempts', type=int, default=0, help='Completed attempts to seed.')
+        seeding.add_argument('--answers', action='store_true', help='Seed an answer per question per attempt.')
+
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+        parser.add_argument('--compare', help='Earlier JSON report to compare against.')
+
+    def handle(self, *args, **options):
+        if options['database'] == 'scratch' and options['target'] != 'client':
+            raise CommandError('A server cannot see the scratch database, use --database current.')
+
+        scratch = options['database'] == 'scratch'
+        with loadtest.scratch_database() if scratch else contextlib.nullcontext():
+            dataset = None
+            if scratch or options['seed'] or options['seed_only']:
+                dataset = generate(
+                    quizzes=options['quizzes'],
+                    questions=options['questions'],
+                    options=options['options'],
+                    users=max(options['users'], 1),
+                    attempts=options['attempts'],
+                    answers=options['answers'],
+                    seed=options['random_seed'],
+                    progress=self.progress,
+                )
+            if options['seed_only']:
+                self.stdout.write(json.dumps(dataset))
+                return
+
+            context = load_context(options['users'])
+            if not context.quizzes or not context.sessions:
+                raise CommandError('No benchmark data, seed it with --seed.')
+
+            make_transport = transport_factory(options['target'])
+            scenarios = {}
+            for name in options['scenario'] or list(SCENARIOS):
+                self.stderr.write(f'Running {name}...')
+                scenarios[name] = run_scenario(
+                    SCENARIOS[name], context, make_transport, options['concurrency'], options['random_seed'],
+                )
+
+        report = {
+            'meta': {
+                'commit': self.commit(),
+                'created_at': timezone.now().isoformat(),
+                'target': options['target'],
+                'database': connection.vendor,
+                'dataset': dataset,
+                'users': options['users'],
+                'concurrency': options['concurrency'],
+            },
+            'scenarios': scenarios,
+        }
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as baseline:
+                report['changes'] = compare(report, json.load(baseline))
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as report_file:
+                report_file.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def progress(self, stage, count):
+        self.stderr.write(f'Seeded {count} {stage}.')
+
+    def commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
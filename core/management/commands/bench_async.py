@@ -0,0 +1,74 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import loadtest
+from core.benchmarks.data import generate
+from core.benchmarks.runner import ClientTransport, arun_scenario, format_summary, run_scenario
+from core.benchmarks.scenarios import SCENARIOS, load_context
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the sync WSGI views with the async ASGI views under concurrent load. '
+        'Every virtual user plays one manage.py bench scenario at once; requests go '
+        'through the in-process WSGI and ASGI handlers against a throwaway test database, '
+        'and the bench summary is reported per mode. SQLite serializes writers, so '
+        'compare attempt numbers on PostgreSQL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=['both', 'sync', 'async'], default='both')
+        parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='finish')
+        parser.add_argument('--concurrency', type=int, default=5000, help='Concurrent virtual users.')
+        parser.add_argument('--workers', type=int, default=64,
+                            help='Worker threads of the simulated WSGI server.')
+        parser.add_argument('--questions', type=int, default=10, help='Questions in the benchmark quiz.')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON.')
+
+    def handle(self, *args, **options):
+        if options['mode'] == 'both':
+            results = [self.run_mode(mode, options) for mode in ('sync', 'async')]
+        else:
+            if (options['mode'] == 'async') != settings.QUIZZY_ASYNC_VIEWS:
+                raise CommandError(f"--mode {options['mode']} needs QUIZZY_ASYNC_VIEWS="
+                                   f"{'1' if options['mode'] == 'async' else '0'}.")
+            results = [self.bench(options)]
+
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+            return
+        for result in results:
+            self.stdout.write(format_summary(result['mode'], result))
+
+    def run_mode(self, mode, options):
+        # the URLconf is chosen at import time, so each mode runs in its own process
+        command = [
+            sys.executable, '-m', 'django', 'bench_async', '--json', '--mode', mode,
+            '--scenario', options['scenario'], '--concurrency', str(options['concurrency']),
+            '--workers', str(options['workers']), '--questions', str(options['questions']),
+        ]
+        env = {**os.environ, 'QUIZZY_ASYNC_VIEWS': '1' if mode == 'async' else '0'}
+        output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+        return json.loads(output)[0]
+
+    def bench(self, options):
+        scenario = SCENARIOS[options['scenario']]
+        with loadtest.scratch_database():
+            generate(quizzes=1, questions=options['questions'], users=options['concurrency'])
+            context = load_context(options['concurrency'])
+            if options['mode'] == 'async':
+                result = arun_scenario(scenario, context, options['concurrency'])
+            else:
+                result = run_scenario(scenario, context, ClientTransport, options['workers'])
+
+        return {
+            'mode': options['mode'],
+            'scenario': options['scenario'],
+            'concurrency': options['concurrency'],
+            **result,
+        }
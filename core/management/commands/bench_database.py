@@ -0,0 +1,77 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core import loadtest
+from core.benchmarks.data import generate
+from core.benchmarks.runner import ClientTransport, format_summary, run_scenario
+from core.benchmarks.scenarios import SCENARIOS, load_context
+
+# environment each profile's run is started with, on top of the current one
+PROFILES = {
+    'sqlite': {'QUIZZY_DB_ENGINE': 'sqlite', 'QUIZZY_SQLITE_TUNING': '0'},
+    'sqlite-tuned': {'QUIZZY_DB_ENGINE': 'sqlite', 'QUIZZY_SQLITE_TUNING': '1'},
+    'postgres': {'QUIZZY_DB_ENGINE': 'postgres', 'QUIZZY_DB_POOL': '0'},
+    'postgres-pool': {'QUIZZY_DB_ENGINE': 'postgres', 'QUIZZY_DB_POOL': '1'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Run a manage.py bench scenario (by default start and finish) against database '
+        'profiles and report the bench summary, throughput and latency percentiles. '
+        'Each profile runs in its own process on a throwaway test database; the '
+        'postgres profiles use the QUIZZY_DB_* connection settings.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=sorted(PROFILES), action='append',
+                            help='Profile to run (repeatable, default: sqlite and sqlite-tuned).')
+        parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='finish')
+        parser.add_argument('--users', type=int, default=500, help='Virtual users, each one attempt.')
+        parser.add_argument('--workers', type=int, default=32, help='Concurrent request threads.')
+        parser.add_argument('--questions', type=int, default=10, help='Questions in the benchmark quiz.')
+        parser.add_argument('--current', action='store_true',
+                            help='Benchmark the database configured in this process only.')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON.')
+
+    def handle(self, *args, **options):
+        if options['current']:
+            results = [self.bench(options)]
+        else:
+            results = [self.run_profile(profile, options)
+                       for profile in options['profile'] or ['sqlite', 'sqlite-tuned']]
+
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+            return
+        for result in results:
+            self.stdout.write(format_summary(result['profile'], result))
+
+    def run_profile(self, profile, options):
+        command = [
+            sys.executable, '-m', 'django', 'bench_database', '--current', '--json',
+            '--scenario', options['scenario'], '--users', str(options['users']),
+            '--workers', str(options['workers']), '--questions', str(options['questions']),
+        ]
+        env = {**os.environ, **PROFILES[profile]}
+        output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+        return {**json.loads(output)[0], 'profile': profile}
+
+    def bench(self, options):
+        with loadtest.scratch_database():
+            generate(quizzes=1, questions=options['questions'], users=options['users'])
+            context = load_context(options['users'])
+            result = run_scenario(SCENARIOS[options['scenario']], context, ClientTransport, options['workers'])
+
+        return {
+            'profile': connection.vendor,
+            'scenario': options['scenario'],
+            'users': options['users'],
+            'workers': options['workers'],
+            **result,
+        }
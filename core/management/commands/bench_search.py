@@ -0,0 +1,121 @@
+import contextlib
+import itertools
+import json
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core import loadtest
+from core.models import Question, Quiz
+from core.search import search_questions
+
+SYLLABLES = ('ka', 'lo', 'mi', 're', 'su', 'ten', 'var', 'po', 'ni', 'dex', 'tor', 'bel', 'qua', 'zin', 'fe', 'rus')
+VOCABULARY = 20000
+PAGE = 10
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a question bank of random text on a throwaway test database and time word '
+        'searches through text__icontains against the full-text index, as the question '
+        'list runs them: a count and the first page. Reports milliseconds per term as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=1_000_000)
+        parser.add_argument('--quizzes', type=int, default=1000, help='Quizzes the questions are spread over.')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per search, the median is reported.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--random-seed', type=int, default=0)
+        parser.add_argument('--database', choices=['scratch', 'current'], default='scratch',
+                            help='current searches the configured database as it is, without seeding.')
+        parser.add_argument('--term', action='append',
+                            help='Search terms (repeatable, default: a common, a rare and a two-word term).')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['random_seed'])
+        vocabulary = words(rng)
+        scratch = options['database'] == 'scratch'
+        with loadtest.scratch_database() if scratch else contextlib.nullcontext():
+            seeded = None
+            if scratch:
+                started = time.perf_counter()
+                seed(rng, vocabulary, options['questions'], options['quizzes'], options['batch_size'], self.progress)
+                seeded = round(time.perf_counter() - started, 2)
+
+            terms = options['term'] or [vocabulary[10], vocabulary[5000], f'{vocabulary[3]} {vocabulary[50]}']
+            searches = {}
+            for term in terms:
+                self.stderr.write(f'Searching {term!r}...')
+                like = Question.objects.all()
+                for word in term.split():
+                    like = like.filter(text__icontains=word)
+                fulltext = search_questions(Question.objects.all(), term)
+                searches[term] = {
+                    'matches': fulltext.count(),
+                    'icontains_ms': timed(like, options['repeat']),
+                    'fulltext_ms': timed(fulltext, options['repeat']),
+                }
+                searches[term]['speedup'] = round(
+                    searches[term]['icontains_ms'] / max(searches[term]['fulltext_ms'], 0.001), 1,
+                )
+
+            report = {
+                'meta': {
+                    'database': connection.vendor,
+                    'questions': Question.objects.count(),
+                    'seed_seconds': seeded,
+                    'repeat': options['repeat'],
+                },
+                'searches': searches,
+            }
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def progress(self, count):
+        self.stderr.write(f'Seeded {count} questions.')
+
+
+def words(rng):
+    """A fixed vocabulary, most frequent words first."""
+    vocabulary = set()
+    while len(vocabulary) < VOCABULARY:
+        vocabulary.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    vocabulary = sorted(vocabulary)
+    rng.shuffle(vocabulary)
+    return vocabulary
+
+
+def seed(rng, vocabulary, questions, quizzes, batch_size, progress):
+    # word frequencies follow Zipf's law, as in natural text
+    weights = list(itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+    owner = User.objects.create_user('bench-search-owner')
+    quiz_ids = [
+        quiz.pk for quiz in Quiz.objects.bulk_create([
+            Quiz(title=f'Search quiz {i}', description='', owner=owner) for i in range(max(quizzes, 1))
+        ])
+    ]
+    for offset in range(0, questions, batch_size):
+        count = min(batch_size, questions - offset)
+        with transaction.atomic():
+            Question.objects.bulk_create([
+                Question(
+                    quiz_id=quiz_ids[(offset + i) % len(quiz_ids)],
+                    text=' '.join(rng.choices(vocabulary, cum_weights=weights, k=rng.randint(6, 14))) + '?',
+                )
+                for i in range(count)
+            ])
+        progress(offset + count)
+
+
+def timed(queryset, repeat):
+    samples = []
+    for _ in range(max(repeat, 1)):
+        started = time.perf_counter()
+        queryset.count()
+        list(queryset.order_by('pk')[:PAGE])
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 2)
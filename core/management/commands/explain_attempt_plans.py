@@ -0,0 +1,135 @@
+import contextlib
+import random
+import time
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, migrations
+from django.db.migrations.state import ProjectState
+from django.utils import timezone
+
+from core import loadtest
+from core.models import AnswerOption, Attempt, Question, Quiz, UserAnswer
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed attempts and answers on a throwaway test database and print query plans '
+        'and timings for the attempt lifecycle queries. With --compare the plans are '
+        'also collected with the attempt and answer indexes dropped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed-answers', type=int, default=100_000,
+                            help='Seed roughly this many user answers before explaining.')
+        parser.add_argument('--questions', type=int, default=50, help='Questions per seeded quiz.')
+        parser.add_argument('--quizzes', type=int, default=20, help='Number of seeded quizzes.')
+        parser.add_argument('--users', type=int, default=1000, help='Number of seeded users.')
+        parser.add_argument('--repeat', type=int, default=50, help='Runs per query when timing.')
+        parser.add_argument('--compare', action='store_true',
+                            help='Also explain the queries without the attempt indexes.')
+
+    def handle(self, *args, **options):
+        with loadtest.scratch_database():
+            self.seed(options)
+            attempt = Attempt.objects.order_by('-id').first()
+
+            if options['compare']:
+                with without_attempt_indexes():
+                    self.explain('before', attempt, options['repeat'])
+
+            self.explain('after', attempt, options['repeat'])
+
+    def queries(self, attempt):
+        return {
+            'open attempt': Attempt.objects.filter(
+                quiz_id=attempt.quiz_id, user_id=attempt.user_id, submitted_at__isnull=True, completed_at__isnull=True,
+            )[:1],
+            'attempts for quiz': Attempt.objects.filter(quiz_id=attempt.quiz_id)[:50],
+            'attempts for user': Attempt.objects.filter(user_id=attempt.user_id)[:50],
+            'answer for question': UserAnswer.objects.filter(
+                attempt_id=attempt.id, question_id=Question.objects.filter(quiz_id=attempt.quiz_id).values('id')[:1],
+            ),
+        }
+
+    def explain(self, label, attempt, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'== {label} =='))
+        for name, queryset in self.queries(attempt).items():
+            started = time.perf_counter()
+            for _ in range(repeat):
+                list(queryset.all())
+            elapsed = (time.perf_counter() - started) / repeat * 1000
+            self.stdout.write(self.style.MIGRATE_LABEL(f'{name}: {elapsed:.3f} ms'))
+            self.stdout.write(queryset.explain())
+
+    def seed(self, options):
+        owner, _ = User.objects.get_or_create(username='bench-owner')
+        users = User.objects.bulk_create(
+            [User(username=f'bench-{i}-{random.getrandbits(32)}') for i in range(options['users'])],
+        )
+
+        quizzes = Quiz.objects.bulk_create([
+            Quiz(title=f'Bench quiz {i}', description='', owner=owner, is_active=True,
+                 questions_count=options['questions'])
+            for i in range(options['quizzes'])
+        ])
+        questions = {}
+        for quiz in quizzes:
+            questions[quiz.id] = Question.objects.bulk_create(
+                [Question(quiz=quiz, text=f'Question {i}') for i in range(options['questions'])],
+            )
+            AnswerOption.objects.bulk_create([
+                AnswerOption(question=question, answer=f'Option {i}', is_correct=i == 0)
+                for question in questions[quiz.id] for i in range(4)
+            ])
+        options_by_question = dict(
+            AnswerOption.objects.filter(question__quiz__in=quizzes, is_correct=True).values_list('question_id', 'id'),
+        )
+
+        seeded = 0
+        now = timezone.now()
+        while seeded < max(options['seed_answers'], 1):
+            attempts = Attempt.objects.bulk_create([
+                Attempt(quiz=random.choice(quizzes), user=random.choice(users), completed_at=now)
+                for _ in range(max(1, BATCH_SIZE // options['questions']))
+            ])
+            answers = [
+                UserAnswer(attempt=attempt, question=question, select_id=options_by_question[question.id])
+                for attempt in attempts for question in questions[attempt.quiz_id]
+            ]
+            UserAnswer.objects.bulk_create(answers, batch_size=BATCH_SIZE)
+            seeded += len(answers)
+            self.stdout.write(f'seeded {seeded} answers', ending='\r')
+        self.stdout.write('')
+
+
+def drop_index_operations():
+    """Operations dropping the indexes and constraints on attempts and answers."""
+    operations = []
+    for model in (Attempt, UserAnswer):
+        name = model._meta.model_name
+        operations += [migrations.RemoveIndex(name, index.name) for index in model._meta.indexes]
+        operations += [migrations.RemoveConstraint(name, constraint.name) for constraint in model._meta.constraints]
+    return operations
+
+
+@contextlib.contextmanager
+def without_attempt_indexes():
+    """Drop the attempt and answer indexes for the block and add them back after it."""
+    operations = drop_index_operations()
+    states = [ProjectState.from_apps(apps)]
+    with connection.schema_editor() as schema_editor:
+        for operation in operations:
+            state = states[-1].clone()
+            operation.state_forwards('core', state)
+            operation.database_forwards('core', schema_editor, states[-1], state)
+            states.append(state)
+    try:
+        yield
+    finally:
+        with connection.schema_editor() as schema_editor:
+            for operation, before, after in reversed(list(zip(operations, states, states[1:]))):
+                operation.database_backwards('core', schema_editor, after, before)
@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exporting import FORMATS, export_rows, filter_attempts, parse_moment, render
+
+
+class Command(BaseCommand):
+    help = (
+        'Export attempts or per-question answers as CSV or JSON Lines. Rows are '
+        'read in primary key batches, so memory use stays flat for any export size.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiz', type=int, help='Only export attempts of this quiz.')
+        parser.add_argument('--since', help='Only attempts started at or after this ISO date/datetime.')
+        parser.add_argument('--until', help='Only attempts started before this ISO date/datetime.')
+        parser.add_argument('--kind', choices=['attempts', 'answers'], default='attempts')
+        parser.add_argument('--output-format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--output', default='-', help="Output file, or '-' for stdout.")
+
+    def handle(self, *args, **options):
+        try:
+            since = parse_moment(options['since'])
+            until = parse_moment(options['until'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        attempts = filter_attempts(options['quiz'], since, until)
+        header, rows = export_rows(options['kind'], attempts)
+
+        output = sys.stdout if options['output'] == '-' else open(options['output'], 'w', encoding='utf-8', newline='')
+        try:
+            for chunk in render(options['output_format'], header, rows):
+                output.write(chunk)
+        finally:
+            if output is not sys.stdout:
+                output.close()
@@ -0,0 +1,66 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importing import CHUNK_SIZE, ImportFailed, iter_records, run_import
+from core.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = (
+        'Import quizzes from a JSON array, a JSON object or JSON Lines file. '
+        'Questions are validated and inserted in chunks; rerun with --job to '
+        'resume a failed import from the last committed chunk.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or '-' for stdin.")
+        parser.add_argument('--owner', help='Username that will own the imported quizzes.')
+        parser.add_argument('--job', type=int, help='Resume this import job.')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Questions per transaction.')
+
+    def handle(self, *args, **options):
+        job = None
+        if options['job']:
+            try:
+                job = ImportJob.objects.select_related('owner').get(pk=options['job'])
+            except ImportJob.DoesNotExist:
+                raise CommandError(f"Import job {options['job']} does not exist.")
+            owner = job.owner
+        elif options['owner']:
+            try:
+                owner = User.objects.get(username=options['owner'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['owner']} does not exist.")
+        else:
+            raise CommandError('Pass --owner for a new import or --job to resume one.')
+
+        path = options['path']
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8')
+        try:
+            job = run_import(
+                iter_records(stream),
+                owner,
+                job=job,
+                source=path,
+                chunk_size=options['chunk_size'],
+                progress=self.report,
+            )
+        except ImportFailed as exc:
+            raise CommandError(
+                f'Import job {exc.job.pk} failed: {exc.job.error}\n'
+                f'Resume it with --job {exc.job.pk} once the cause is fixed.'
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(f'Import job {job.pk} completed: {job.records_done} quizzes imported.'))
+
+    def report(self, job):
+        self.stdout.write(
+            f'job {job.pk}: {job.records_done} quizzes done, {job.questions_done} questions into the current one',
+            ending='\r',
+        )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from core.analytics import rebuild_quiz_stats
+from core.grading import AnswerKey
+from core.leaderboard import rebuild_leaderboard
+from core.models import Quiz
+
+
+class Command(BaseCommand):
+    help = 'Recompute the quiz statistics and leaderboard tables from attempts and answers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiz', type=int, action='append', help='Only rebuild this quiz (repeatable).')
+
+    def handle(self, *args, **options):
+        quizzes = Quiz.objects.only('content_version').order_by('pk')
+        if options['quiz']:
+            quizzes = quizzes.filter(pk__in=options['quiz'])
+
+        rebuilt = 0
+        for quiz in quizzes.iterator():
+            rebuild_quiz_stats(quiz, AnswerKey.compile(quiz))
+            rebuild_leaderboard(quiz)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt statistics for {rebuilt} quizzes.'))
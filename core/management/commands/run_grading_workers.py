@@ -0,0 +1,64 @@
+import multiprocessing
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from core.grading_queue import BATCH_SIZE, LEASE_SECONDS, MAX_TRIES, requeue_failed, run_batch
+
+
+def work(options, stop):
+    # Ctrl-C reaches the whole process group; the parent asks workers to stop between batches
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    while not stop.is_set():
+        close_old_connections()
+        claimed = run_batch(options['batch_size'], options['lease'], options['max_tries'])
+        if not claimed:
+            if options['once']:
+                return
+            stop.wait(options['poll'])
+
+
+class Command(BaseCommand):
+    help = (
+        'Grade submissions queued by the deferred finish endpoint with a pool of '
+        'worker processes. Jobs are leased, so a crashed worker\'s batch is picked '
+        'up again once its lease runs out.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count())
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Jobs claimed per lease.')
+        parser.add_argument('--lease', type=int, default=LEASE_SECONDS, help='Lease length in seconds.')
+        parser.add_argument('--max-tries', type=int, default=MAX_TRIES,
+                            help='Failed gradings before a job is marked failed.')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty.')
+        parser.add_argument('--requeue-failed', action='store_true', help='Queue failed jobs again first.')
+
+    def handle(self, *args, **options):
+        if options['requeue_failed']:
+            self.stdout.write(f'Requeued {requeue_failed()} failed jobs.')
+
+        # forked workers must open their own database connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        stop = context.Event()
+        workers = [context.Process(target=work, args=(options, stop)) for _ in range(max(options['processes'], 1))]
+        for worker in workers:
+            worker.start()
+
+        started = time.monotonic()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            # let every worker finish the batch it holds
+            stop.set()
+            for worker in workers:
+                worker.join()
+        self.stdout.write(self.style.SUCCESS(
+            f'Grading workers stopped after {time.monotonic() - started:.1f}s.'
+        ))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:32
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_questions_count(apps, schema_editor):
+    Quiz = apps.get_model('core', 'Quiz')
+    Question = apps.get_model('core', 'Question')
+    counts = Question.objects.filter(quiz=OuterRef('pk')).order_by().values('quiz').annotate(
+        total=Count('pk'),
+    ).values('total')
+    Quiz.objects.update(questions_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_quiz_content_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='questions_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_questions_count, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['-created_at', '-id'], name='quiz_created_id_idx'),
+        ),
+    ]
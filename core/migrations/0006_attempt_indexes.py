@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:35
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def delete_duplicate_answers(apps, schema_editor):
+    UserAnswer = apps.get_model('core', 'UserAnswer')
+    latest = UserAnswer.objects.order_by().values('attempt', 'question').annotate(
+        latest_id=Max('id'),
+    ).values('latest_id')
+    UserAnswer.objects.exclude(id__in=latest).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_quiz_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attempt',
+            index=models.Index(condition=models.Q(('completed_at__isnull', True)), fields=['quiz', 'user', '-started_at'], name='attempt_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attempt',
+            index=models.Index(fields=['quiz', '-started_at'], name='attempt_quiz_started_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attempt',
+            index=models.Index(fields=['user', '-started_at'], name='attempt_user_started_idx'),
+        ),
+        migrations.RunPython(delete_duplicate_answers, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='useranswer',
+            constraint=models.UniqueConstraint(fields=('attempt', 'question'), name='useranswer_attempt_question_uniq'),
+        ),
+    ]
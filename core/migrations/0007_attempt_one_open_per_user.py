@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:36
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def close_duplicate_open_attempts(apps, schema_editor):
+    Attempt = apps.get_model('core', 'Attempt')
+    open_attempts = Attempt.objects.filter(completed_at__isnull=True)
+    latest = open_attempts.order_by().values('quiz', 'user').annotate(latest_id=Max('id')).values('latest_id')
+    open_attempts.exclude(id__in=latest).update(completed_at=F('started_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_attempt_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='attempt',
+            name='attempt_open_idx',
+        ),
+        migrations.RunPython(close_duplicate_open_attempts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attempt',
+            constraint=models.UniqueConstraint(condition=models.Q(('completed_at__isnull', True)), fields=('quiz', 'user'), name='attempt_one_open_per_user'),
+        ),
+    ]
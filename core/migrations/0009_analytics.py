@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def create_quiz_stats(apps, schema_editor):
+    # Pass counts, score buckets and option selections need the answer key,
+    # run `manage.py rebuild_quiz_stats` to fill them in for existing attempts.
+    Quiz = apps.get_model('core', 'Quiz')
+    QuizStats = apps.get_model('core', 'QuizStats')
+    quizzes = Quiz.objects.annotate(
+        started=Count('attempts'),
+        completed=Count('attempts', filter=Q(attempts__completed_at__isnull=False)),
+        total=Sum('attempts__score', filter=Q(attempts__completed_at__isnull=False)),
+    ).values_list('id', 'started', 'completed', 'total')
+    QuizStats.objects.bulk_create([
+        QuizStats(quiz_id=quiz_id, attempts_count=started, completed_count=completed, score_total=total or 0)
+        for quiz_id, started, completed, total in quizzes.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_importjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizStats',
+            fields=[
+                ('quiz', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.quiz')),
+                ('attempts_count', models.PositiveIntegerField(default=0)),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('passed_count', models.PositiveIntegerField(default=0)),
+                ('score_total', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuestionOptionStats',
+            fields=[
+                ('option', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.answeroption')),
+                ('selections', models.PositiveIntegerField(default=0)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='option_stats', to='core.question')),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='option_stats', to='core.quiz')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuizScoreBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.IntegerField()),
+                ('attempts_count', models.PositiveIntegerField(default=0)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_buckets', to='core.quiz')),
+            ],
+            options={
+                'ordering': ['score'],
+                'constraints': [models.UniqueConstraint(fields=('quiz', 'score'), name='quizscorebucket_quiz_score_uniq')],
+            },
+        ),
+        migrations.RunPython(create_quiz_stats, migrations.RunPython.noop),
+    ]
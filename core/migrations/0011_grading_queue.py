@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_leaderboard'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradingJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answers', models.JSONField(default=list)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=16)),
+                ('locked_by', models.CharField(blank=True, max_length=64)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('tries', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.RemoveConstraint(
+            model_name='attempt',
+            name='attempt_one_open_per_user',
+        ),
+        migrations.AddField(
+            model_name='attempt',
+            name='submitted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='attempt',
+            constraint=models.UniqueConstraint(condition=models.Q(('completed_at__isnull', True), ('submitted_at__isnull', True)), fields=('quiz', 'user'), name='attempt_one_open_per_user'),
+        ),
+        migrations.AddField(
+            model_name='gradingjob',
+            name='attempt',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='grading_job', to='core.attempt'),
+        ),
+        migrations.AddIndex(
+            model_name='gradingjob',
+            index=models.Index(fields=['status', 'id'], name='gradingjob_status_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:07
+
+from django.db import migrations, models
+from django.db.models import Prefetch
+
+BATCH_SIZE = 500
+
+
+def snapshot_completed_attempts(apps, schema_editor):
+    # Same shape as core.grading.result_snapshot, from the questions and
+    # options as they are now since earlier versions are not recorded.
+    Attempt = apps.get_model('core', 'Attempt')
+    UserAnswer = apps.get_model('core', 'UserAnswer')
+    attempts = Attempt.objects.filter(completed_at__isnull=False, result__isnull=True).select_related(
+        'quiz', 'user',
+    ).prefetch_related(
+        Prefetch('answers', queryset=UserAnswer.objects.select_related('question', 'select').order_by('question_id')),
+    ).order_by('pk')
+
+    batch = []
+    for attempt in attempts.iterator(chunk_size=BATCH_SIZE):
+        attempt.result = {
+            'quiz_title': attempt.quiz.title,
+            'user_username': attempt.user.username,
+            'answers': [
+                {
+                    'question_text': answer.question.text,
+                    'selected_answer': answer.select.answer,
+                    'is_correct': answer.select.is_correct,
+                }
+                for answer in attempt.answers.all()
+            ],
+        }
+        batch.append(attempt)
+        if len(batch) == BATCH_SIZE:
+            Attempt.objects.bulk_update(batch, ['result'])
+            batch = []
+    Attempt.objects.bulk_update(batch, ['result'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_grading_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='result',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(snapshot_completed_attempts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:24
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='question_ids',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='attempt',
+            name='seed',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='sample_size',
+            field=models.PositiveIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='shuffle_options',
+            field=models.BooleanField(default=False),
+        ),
+    ]
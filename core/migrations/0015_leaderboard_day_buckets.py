@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:36
+
+import datetime
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def count_entries_per_day(apps, schema_editor):
+    # same buckets as core.leaderboard.buckets_of, by UTC day
+    LeaderboardEntry = apps.get_model('core', 'LeaderboardEntry')
+    LeaderboardDayBucket = apps.get_model('core', 'LeaderboardDayBucket')
+    entries = LeaderboardEntry.objects.order_by().values_list('quiz_id', 'score', 'completed_at')
+    days = Counter(
+        (quiz_id, score, completed_at.astimezone(datetime.timezone.utc).date())
+        for quiz_id, score, completed_at in entries.iterator(chunk_size=BATCH_SIZE)
+    )
+    LeaderboardDayBucket.objects.bulk_create([
+        LeaderboardDayBucket(quiz_id=quiz_id, score=score, day=day, entries_count=total)
+        for (quiz_id, score, day), total in days.items()
+    ], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_sampling'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardDayBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.IntegerField()),
+                ('day', models.DateField()),
+                ('entries_count', models.PositiveIntegerField(default=0)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_day_buckets', to='core.quiz')),
+            ],
+            options={
+                'ordering': ['-score', 'day'],
+                'constraints': [models.UniqueConstraint(fields=('quiz', 'score', 'day'), name='leaderboarddaybucket_quiz_score_day_uniq')],
+            },
+        ),
+        migrations.RunPython(count_entries_per_day, migrations.RunPython.noop),
+    ]
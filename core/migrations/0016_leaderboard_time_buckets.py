@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:57
+
+import datetime
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+# same spans as core.leaderboard.SPANS
+SPANS = {
+    'day': {'hour': 0, 'minute': 0, 'second': 0, 'microsecond': 0},
+    'hour': {'minute': 0, 'second': 0, 'microsecond': 0},
+    'minute': {'second': 0, 'microsecond': 0},
+    'second': {'microsecond': 0},
+}
+
+
+def count_entries_per_span(apps, schema_editor):
+    LeaderboardEntry = apps.get_model('core', 'LeaderboardEntry')
+    LeaderboardTimeBucket = apps.get_model('core', 'LeaderboardTimeBucket')
+    entries = LeaderboardEntry.objects.order_by().values_list('quiz_id', 'score', 'completed_at')
+    spans = Counter(
+        (quiz_id, score, span, completed_at.astimezone(datetime.timezone.utc).replace(**fields))
+        for quiz_id, score, completed_at in entries.iterator(chunk_size=BATCH_SIZE)
+        for span, fields in SPANS.items()
+    )
+    LeaderboardTimeBucket.objects.bulk_create([
+        LeaderboardTimeBucket(quiz_id=quiz_id, score=score, span=span, start=start, entries_count=total)
+        for (quiz_id, score, span, start), total in spans.items()
+    ], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_leaderboard_day_buckets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardTimeBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.IntegerField()),
+                ('span', models.CharField(choices=[('day', 'Day'), ('hour', 'Hour'), ('minute', 'Minute'), ('second', 'Second')], max_length=8)),
+                ('start', models.DateTimeField()),
+                ('entries_count', models.PositiveIntegerField(default=0)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_time_buckets', to='core.quiz')),
+            ],
+            options={
+                'ordering': ['-score', 'span', 'start'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboardtimebucket',
+            constraint=models.UniqueConstraint(fields=('quiz', 'score', 'span', 'start'), name='leaderboardtimebucket_quiz_score_span_start_uniq'),
+        ),
+        migrations.RunPython(count_entries_per_span, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='LeaderboardDayBucket',
+        ),
+    ]
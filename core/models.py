@@ -1,24 +1,70 @@
 from django.contrib.auth.models import User
-from django.db import models
+from django.core.validators import MinValueValidator
+from django.db import models, transaction
+from django.db.models import F, Prefetch
+from django.utils import timezone
+
+class QuizQuerySet(models.QuerySet):
+    def with_questions(self):
+        return self.select_related('owner').prefetch_related(
+            Prefetch('questions', queryset=Question.objects.prefetch_related('options')),
+        )
+
+    def summary(self):
+        return self.select_related('owner').only(
+            'title', 'created_at', 'is_active', 'questions_count', 'owner__username',
+        )
+
+    def bump_version(self, **changes):
+        return self.update(content_version=F('content_version') + 1, updated_at=timezone.now(), **changes)
 
 class Quiz(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField()
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=False)
+    content_version = models.PositiveIntegerField(default=1, editable=False)
+    questions_count = models.PositiveIntegerField(default=0, editable=False)
+    # questions drawn at random for each attempt, all of them when empty; see core.sampling
+    sample_size = models.PositiveIntegerField(null=True, blank=True, validators=[MinValueValidator(1)])
+    shuffle_options = models.BooleanField(default=False)
+
+    objects = QuizQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='quiz_created_id_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+class QuestionQuerySet(models.QuerySet):
+    def bulk_create_with_options(self, quiz, questions_data):
+        with transaction.atomic():
+            questions = self.bulk_create([
+                Question(quiz=quiz, **{key: value for key, value in data.items() if key != 'options'})
+                for data in questions_data
+            ])
+            AnswerOption.objects.bulk_create([
+                AnswerOption(question=question, **option_data)
+                for question, data in zip(questions, questions_data)
+                for option_data in data.get('options', [])
+            ])
+            # bulk_create sends no signals, bump the quiz once for the whole batch
+            Quiz.objects.filter(pk=quiz.pk).bump_version(questions_count=F('questions_count') + len(questions))
+        return questions
+
 class Question(models.Model):
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='questions')
     text = models.TextField()
     score = models.IntegerField(default=1)
 
+    objects = QuestionQuerySet.as_manager()
+
     class Meta:
         ordering = ['id']
 
@@ -40,11 +86,28 @@ class Attempt(models.Model):
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='attempts')
     user = models.ForeignKey(User, on_delete=models.CASCADE,related_name='quiz_attempts')
     started_at = models.DateTimeField(auto_now_add=True)
+    submitted_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     score = models.IntegerField(default=0)
+    # written once when the attempt is graded, see grading.result_snapshot
+    result = models.JSONField(null=True, blank=True, editable=False)
+    # the questions drawn for this attempt, all of the quiz's when empty, and the draw's seed
+    question_ids = models.JSONField(null=True, blank=True, editable=False)
+    seed = models.PositiveIntegerField(null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['quiz', '-started_at'], name='attempt_quiz_started_idx'),
+            models.Index(fields=['user', '-started_at'], name='attempt_user_started_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['quiz', 'user'],
+                condition=models.Q(submitted_at__isnull=True, completed_at__isnull=True),
+                name='attempt_one_open_per_user',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user} - {self.quiz.title} ({self.started_at.date()})"
@@ -56,6 +119,162 @@ class UserAnswer(models.Model):
 
     class Meta:
         ordering = ['question__id']
+        constraints = [
+            models.UniqueConstraint(fields=['attempt', 'question'], name='useranswer_attempt_question_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.attempt.user} — {self.question.text[:30]}"
+
+class ImportJob(models.Model):
+    STATUS_RUNNING = 'running'
+    STATUS_FAILED = 'failed'
+    STATUS_COMPLETED = 'completed'
+    STATUS_CHOICES = [
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_FAILED, 'Failed'),
+        (STATUS_COMPLETED, 'Completed'),
+    ]
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='import_jobs')
+    source = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_RUNNING)
+    records_done = models.PositiveIntegerField(default=0)
+    questions_done = models.PositiveIntegerField(default=0)
+    current_quiz = models.ForeignKey(Quiz, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.source or 'import'} #{self.pk} ({self.status})"
+
+class GradingJob(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    attempt = models.OneToOneField(Attempt, on_delete=models.CASCADE, related_name='grading_job')
+    answers = models.JSONField(default=list)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    tries = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'id'], name='gradingjob_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Grading of attempt {self.attempt_id} ({self.status})"
+
+class QuizStats(models.Model):
+    quiz = models.OneToOneField(Quiz, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    attempts_count = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    passed_count = models.PositiveIntegerField(default=0)
+    score_total = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.quiz_id}: {self.completed_count}/{self.attempts_count}"
+
+class QuizScoreBucket(models.Model):
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='score_buckets')
+    score = models.IntegerField()
+    attempts_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['score']
+        constraints = [
+            models.UniqueConstraint(fields=['quiz', 'score'], name='quizscorebucket_quiz_score_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.quiz_id}: {self.score} x{self.attempts_count}"
+
+class QuestionOptionStats(models.Model):
+    option = models.OneToOneField(AnswerOption, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='option_stats')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='option_stats')
+    selections = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.option_id}: {self.selections}"
+
+class LeaderboardEntry(models.Model):
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='leaderboard')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    attempt = models.OneToOneField(Attempt, on_delete=models.CASCADE, related_name='+')
+    score = models.IntegerField()
+    completed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-score', 'completed_at', 'attempt_id']
+        indexes = [
+            models.Index(fields=['quiz', '-score', 'completed_at', 'attempt'], name='leaderboard_rank_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['quiz', 'user'], name='leaderboardentry_quiz_user_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.quiz_id}: {self.score}"
+
+class LeaderboardBucket(models.Model):
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='leaderboard_buckets')
+    score = models.IntegerField()
+    entries_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-score']
+        constraints = [
+            models.UniqueConstraint(fields=['quiz', 'score'], name='leaderboardbucket_quiz_score_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.quiz_id}: {self.score} x{self.entries_count}"
+
+class LeaderboardTimeBucket(models.Model):
+    SPAN_DAY = 'day'
+    SPAN_HOUR = 'hour'
+    SPAN_MINUTE = 'minute'
+    SPAN_SECOND = 'second'
+    SPAN_CHOICES = [
+        (SPAN_DAY, 'Day'),
+        (SPAN_HOUR, 'Hour'),
+        (SPAN_MINUTE, 'Minute'),
+        (SPAN_SECOND, 'Second'),
+    ]
+
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='leaderboard_time_buckets')
+    score = models.IntegerField()
+    span = models.CharField(max_length=8, choices=SPAN_CHOICES)
+    # the UTC start of the day, hour, minute or second the entries were completed in
+    start = models.DateTimeField()
+    entries_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-score', 'span', 'start']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['quiz', 'score', 'span', 'start'], name='leaderboardtimebucket_quiz_score_span_start_uniq',
+            ),
+        ]
 
     def __str__(self):
-        return f"{self.attempt.user} — {self.question.text[:30]}"
\ No newline at end of file
+        return f"{self.quiz_id}: {self.score} in the {self.span} of {self.start} x{self.entries_count}"
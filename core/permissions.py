@@ -1,14 +1,41 @@
-from rest_framework.permissions import BasePermission
+from django.db.models import F
+from rest_framework.permissions import SAFE_METHODS, BasePermission
 
-from core.models import Quiz
+from core.models import Question, Quiz
+
+
+def with_quiz_owner(queryset, quiz_path):
+    """Annotate rows with `quiz_owner_id`, the owner of the quiz at `quiz_path`."""
+    return queryset.annotate(quiz_owner_id=F(f'{quiz_path}__owner_id'))
+
+
+def quiz_owner_id(request, quiz_id, question_id=None):
+    """
+    Id of the owner of quiz `quiz_id`, or None when there is no such quiz
+    or it has no question `question_id`.
+
+    One values query per quiz and question, remembered on the request.
+    """
+    owners = getattr(request, '_quiz_owners', None)
+    if owners is None:
+        owners = request._quiz_owners = {}
+
+    key = (quiz_id, question_id)
+    if key not in owners:
+        if question_id is None:
+            owner_ids = Quiz.objects.filter(pk=quiz_id).values_list('owner_id', flat=True)
+        else:
+            owner_ids = Question.objects.filter(pk=question_id, quiz=quiz_id).values_list('quiz__owner_id', flat=True)
+        owners[key] = owner_ids.first()
+    return owners[key]
 
 
 class IsOwnerOrReadOnly(BasePermission):
     def has_object_permission(self, request, view, obj):
-        if request.method in ['GET', 'HEAD', 'OPTIONS']:
+        if request.method in SAFE_METHODS:
             return True
 
-        return obj.owner == request.user
+        return obj.owner_id == request.user.id
 
 
 class IsQuizOwner(BasePermission):
@@ -16,9 +43,6 @@ class IsQuizOwner(BasePermission):
     def has_permission(self, request, view):
         quiz_id = view.kwargs.get('quiz_id')
         if quiz_id:
-            try:
-                quiz = Quiz.objects.get(id=quiz_id)
-                return quiz.owner == request.user
-            except Quiz.DoesNotExist:
-                return False
+            owner_id = quiz_owner_id(request, quiz_id)
+            return owner_id is not None and owner_id == request.user.id
         return False
@@ -0,0 +1,98 @@
+"""
+Random question draws for quizzes with a sample size.
+
+A new attempt of a quiz with `sample_size` set gets its own random draw of
+that many questions, stored on the attempt with the seed it was drawn with;
+the seed also orders the answer options of quizzes with `shuffle_options`.
+Draws pick from the quiz's question ids, cached per content version like the
+answer key, so starting an attempt does not read or sort the question table
+however large the pool grows.
+"""
+import random
+import secrets
+
+from django.core.cache import cache
+
+from .caching import LocalLRU
+from .models import Question
+
+QUESTION_IDS_TIMEOUT = 60 * 60 * 24
+# id lists can be long, keep fewer of them than answer keys
+QUESTION_IDS_KEPT = 64
+
+# quiz id -> (content version, question ids), for the most recently started quizzes
+_question_ids = LocalLRU(QUESTION_IDS_KEPT)
+
+
+def question_ids_query(quiz):
+    return Question.objects.filter(quiz_id=quiz.id).order_by('pk').values_list('id', flat=True)
+
+
+def get_question_ids(quiz):
+    memo = _question_ids.get(quiz.id)
+    if memo is not None and memo[0] == quiz.content_version:
+        return memo[1]
+
+    cache_key = f'question-ids:{quiz.id}:{quiz.content_version}'
+    question_ids = cache.get(cache_key)
+    if question_ids is None:
+        question_ids = list(question_ids_query(quiz))
+        cache.set(cache_key, question_ids, QUESTION_IDS_TIMEOUT)
+
+    _question_ids[quiz.id] = (quiz.content_version, question_ids)
+    return question_ids
+
+
+async def aget_question_ids(quiz):
+    memo = _question_ids.get(quiz.id)
+    if memo is not None and memo[0] == quiz.content_version:
+        return memo[1]
+
+    cache_key = f'question-ids:{quiz.id}:{quiz.content_version}'
+    question_ids = await cache.aget(cache_key)
+    if question_ids is None:
+        question_ids = [question_id async for question_id in question_ids_query(quiz)]
+        await cache.aset(cache_key, question_ids, QUESTION_IDS_TIMEOUT)
+
+    _question_ids[quiz.id] = (quiz.content_version, question_ids)
+    return question_ids
+
+
+def draw(quiz, question_ids):
+    """
+    Attempt fields for a new draw: a seed and, when the pool is larger than
+    the sample, the drawn question ids in the order they are asked.
+    """
+    seed = secrets.randbits(31)
+    drawn = None
+    if quiz.sample_size and quiz.sample_size < len(question_ids):
+        # random.sample over a list picks by index, in time proportional to the sample
+        drawn = random.Random(seed).sample(question_ids, quiz.sample_size)
+    return {'seed': seed, 'question_ids': drawn}
+
+
+def draw_questions(quiz):
+    return draw(quiz, get_question_ids(quiz) if quiz.sample_size else [])
+
+
+async def adraw_questions(quiz):
+    return draw(quiz, await aget_question_ids(quiz) if quiz.sample_size else [])
+
+
+def attempt_questions(attempt):
+    """
+    The attempt's questions in the order they are asked, each with its
+    answer options, shuffled per attempt, in `drawn_options`.
+    """
+    questions = Question.objects.filter(quiz_id=attempt.quiz_id).prefetch_related('options')
+    if attempt.question_ids is None:
+        questions = list(questions)
+    else:
+        position = {question_id: index for index, question_id in enumerate(attempt.question_ids)}
+        questions = sorted(questions.filter(pk__in=attempt.question_ids), key=lambda question: position[question.pk])
+
+    for question in questions:
+        question.drawn_options = list(question.options.all())
+        if attempt.quiz.shuffle_options and attempt.seed is not None:
+            random.Random(f'{attempt.seed}:{question.pk}').shuffle(question.drawn_options)
+    return questions
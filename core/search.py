@@ -0,0 +1,155 @@
+"""
+Full-text search over questions and quizzes.
+
+On SQLite the text lives in FTS5 tables, core_question_fts and
+core_quiz_fts, that index the base tables as external content and are kept
+in step by triggers, so bulk writes and queryset deletes are indexed too.
+On PostgreSQL the same searches use GIN indexes over tsvector expressions.
+Both are created by migration 0013; other backends fall back to icontains.
+
+Search terms are split into words and every word has to match as a prefix
+of a word in the text, on either backend.
+"""
+import re
+from functools import reduce
+from operator import and_
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+WORD = re.compile(r'\w+')
+
+SQLITE_TABLES = {
+    'core_question_fts': ('core_question', ('text',)),
+    'core_quiz_fts': ('core_quiz', ('title', 'description')),
+}
+# title matches count ten times as much as description matches
+SQLITE_QUIZ_RANK = 'bm25(10.0, 1.0)'
+
+QUESTION_VECTOR = "to_tsvector('simple', \"core_question\".\"text\")"
+QUIZ_VECTOR = (
+    "setweight(to_tsvector('simple', \"core_quiz\".\"title\"), 'A') || "
+    "setweight(to_tsvector('simple', \"core_quiz\".\"description\"), 'B')"
+)
+
+
+def words(terms):
+    return WORD.findall(terms or '')
+
+
+def sqlite_query(terms):
+    return ' '.join(f'"{word}"*' for word in words(terms))
+
+
+def postgresql_query(terms):
+    return ' & '.join(f'{word}:*' for word in words(terms))
+
+
+def sqlite_triggers(fts_table):
+    table, columns = SQLITE_TABLES[fts_table]
+    names = ', '.join(columns)
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+    delete = f"INSERT INTO {fts_table}({fts_table}, rowid, {names}) VALUES ('delete', old.id, {old});"
+    insert = f'INSERT INTO {fts_table}(rowid, {names}) VALUES (new.id, {new});'
+    return [
+        f'CREATE TRIGGER IF NOT EXISTS {fts_table}_insert AFTER INSERT ON {table} BEGIN {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts_table}_delete AFTER DELETE ON {table} BEGIN {delete} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts_table}_update AFTER UPDATE OF {names} ON {table} '
+        f'BEGIN {delete} {insert} END',
+    ]
+
+
+def create_index(schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        for fts_table, (table, columns) in SQLITE_TABLES.items():
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {fts_table} USING fts5({', '.join(columns)}, "
+                f"content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+            )
+            schema_editor.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+            for statement in sqlite_triggers(fts_table):
+                schema_editor.execute(statement)
+        schema_editor.execute(f"INSERT INTO core_quiz_fts(core_quiz_fts, rank) VALUES ('rank', '{SQLITE_QUIZ_RANK}')")
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute(f'CREATE INDEX question_text_search_idx ON core_question USING GIN (({QUESTION_VECTOR}))')
+        schema_editor.execute(f'CREATE INDEX quiz_search_idx ON core_quiz USING GIN (({QUIZ_VECTOR}))')
+
+
+def drop_index(schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        for fts_table in SQLITE_TABLES:
+            for action in ('insert', 'delete', 'update'):
+                schema_editor.execute(f'DROP TRIGGER IF EXISTS {fts_table}_{action}')
+            schema_editor.execute(f'DROP TABLE IF EXISTS {fts_table}')
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS question_text_search_idx')
+        schema_editor.execute('DROP INDEX IF EXISTS quiz_search_idx')
+
+
+def restore_triggers(connection):
+    """
+    Put back triggers lost to a table rebuild.
+
+    SQLite migrations that alter core_question or core_quiz copy the table
+    into a new one, which takes the triggers along with the old table but
+    keeps ids and text, so the index itself stays valid.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for fts_table in SQLITE_TABLES:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [fts_table])
+            if cursor.fetchone() is None:
+                continue
+            for statement in sqlite_triggers(fts_table):
+                cursor.execute(statement)
+
+
+def search_questions(queryset, terms):
+    """Questions whose text matches every word of `terms`."""
+    vendor = connections[queryset.db].vendor
+    if not words(terms):
+        return queryset.none()
+    if vendor == 'sqlite':
+        return queryset.filter(pk__in=RawSQL(
+            'SELECT rowid FROM core_question_fts WHERE core_question_fts MATCH %s', [sqlite_query(terms)],
+        ))
+    if vendor == 'postgresql':
+        return queryset.filter(RawSQL(
+            f"{QUESTION_VECTOR} @@ to_tsquery('simple', %s)", [postgresql_query(terms)], output_field=BooleanField(),
+        ))
+    return queryset.filter(reduce(and_, (Q(text__icontains=word) for word in words(terms))))
+
+
+def search_quizzes(queryset, terms):
+    """
+    Quizzes whose title or description match every word of `terms`,
+    annotated with `relevance` and ordered by it, best first.
+    """
+    vendor = connections[queryset.db].vendor
+    if not words(terms):
+        return queryset.none()
+    if vendor == 'sqlite':
+        query = sqlite_query(terms)
+        queryset = queryset.filter(pk__in=RawSQL(
+            'SELECT rowid FROM core_quiz_fts WHERE core_quiz_fts MATCH %s', [query],
+        )).annotate(relevance=RawSQL(
+            # FTS5 ranks best matches lowest
+            '-(SELECT rank FROM core_quiz_fts WHERE core_quiz_fts MATCH %s AND rowid = "core_quiz"."id")',
+            [query], output_field=FloatField(),
+        ))
+    elif vendor == 'postgresql':
+        query = postgresql_query(terms)
+        queryset = queryset.filter(RawSQL(
+            f"{QUIZ_VECTOR} @@ to_tsquery('simple', %s)", [query], output_field=BooleanField(),
+        )).annotate(relevance=RawSQL(
+            f"ts_rank({QUIZ_VECTOR}, to_tsquery('simple', %s))", [query], output_field=FloatField(),
+        ))
+    else:
+        matches = reduce(and_, (Q(title__icontains=word) | Q(description__icontains=word) for word in words(terms)))
+        queryset = queryset.filter(matches).annotate(relevance=Value(0.0, output_field=FloatField()))
+    return queryset.order_by('-relevance', 'pk')
@@ -1,5 +1,7 @@
+from django.db import transaction
 from rest_framework import serializers
-from .models import Question, Quiz, Attempt, AnswerOption, UserAnswer
+from .grading_queue import attempt_status
+from .models import Question, Quiz, Attempt, AnswerOption, UserAnswer, ImportJob, LeaderboardEntry
 
 
 class AnswerOptionSerializer(serializers.ModelSerializer):
@@ -37,13 +39,8 @@ class QuestionCreateSerializer(serializers.ModelSerializer):
         ]
 
     def create(self, validated_data):
-        options_data = validated_data.pop('options')
-        question = Question.objects.create(**validated_data)
-        
-        for option_data in options_data:
-            AnswerOption.objects.create(question=question, **option_data)
-        
-        return question
+        quiz = validated_data.pop('quiz')
+        return Question.objects.bulk_create_with_options(quiz, [validated_data])[0]
 
 
 class QuizSerializer(serializers.ModelSerializer):
@@ -51,7 +48,6 @@ class QuizSerializer(serializers.ModelSerializer):
     owner = serializers.StringRelatedField()
     owner_id = serializers.IntegerField(source='owner.id', read_only=True)
     is_owner = serializers.SerializerMethodField()
-    questions_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Quiz
@@ -66,16 +62,38 @@ class QuizSerializer(serializers.ModelSerializer):
             'is_active',
             'questions',
             'questions_count',
+            'sample_size',
+            'shuffle_options',
         ]
     
     def get_is_owner(self, obj):
         request = self.context.get('request')
         if request and hasattr(request, 'user'):
-            return obj.owner == request.user
+            return obj.owner_id == request.user.id
         return False
-    
-    def get_questions_count(self, obj):
-        return obj.questions.count()
+
+
+class QuizSummarySerializer(serializers.ModelSerializer):
+    owner = serializers.StringRelatedField()
+
+    class Meta:
+        model = Quiz
+        fields = [
+            'id',
+            'title',
+            'owner',
+            'owner_id',
+            'created_at',
+            'is_active',
+            'questions_count',
+        ]
+
+
+class QuizSearchSerializer(QuizSummarySerializer):
+    relevance = serializers.FloatField(read_only=True)
+
+    class Meta(QuizSummarySerializer.Meta):
+        fields = QuizSummarySerializer.Meta.fields + ['relevance']
 
 
 class QuizCreateSerializer(serializers.ModelSerializer):
@@ -87,21 +105,19 @@ class QuizCreateSerializer(serializers.ModelSerializer):
             'title',
             'description',
             'is_active',
+            'sample_size',
+            'shuffle_options',
             'questions',
         ]
 
     def create(self, validated_data):
         questions_data = validated_data.pop('questions', [])
-        quiz = Quiz.objects.create(**validated_data)
-        
-        for question_data in questions_data:
-            options_data = question_data.pop('options', [])
-            question = Question.objects.create(quiz=quiz, **question_data)
-            
-            for option_data in options_data:
-                AnswerOption.objects.create(question=question, **option_data)
-        
-        return quiz
+
+        with transaction.atomic():
+            quiz = Quiz.objects.create(**validated_data)
+            Question.objects.bulk_create_with_options(quiz, questions_data)
+
+        return Quiz.objects.with_questions().get(pk=quiz.pk)
 
 
 class UserAnswerSerializer(serializers.ModelSerializer):
@@ -132,5 +148,84 @@ class AttemptSerializer(serializers.ModelSerializer):
             'started_at',
             'completed_at',
             'score',
+            'question_ids',
             'answers',
-        ]
\ No newline at end of file
+        ]
+
+    def to_representation(self, instance):
+        # graded attempts carry their quiz title, user and answers in Attempt.result
+        if instance.result is None:
+            return super().to_representation(instance)
+
+        data = {}
+        for field in self._readable_fields:
+            if field.field_name in instance.result:
+                data[field.field_name] = instance.result[field.field_name]
+                continue
+            attribute = field.get_attribute(instance)
+            data[field.field_name] = None if attribute is None else field.to_representation(attribute)
+        return data
+
+
+class AttemptOptionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AnswerOption
+        fields = [
+            'id',
+            'answer',
+        ]
+
+
+class AttemptQuestionSerializer(serializers.ModelSerializer):
+    options = AttemptOptionSerializer(source='drawn_options', many=True, read_only=True)
+
+    class Meta:
+        model = Question
+        fields = [
+            'id',
+            'text',
+            'score',
+            'options',
+        ]
+
+
+class AttemptStatusSerializer(AttemptSerializer):
+    status = serializers.SerializerMethodField()
+
+    class Meta(AttemptSerializer.Meta):
+        fields = AttemptSerializer.Meta.fields + ['submitted_at', 'status']
+
+    def get_status(self, obj):
+        return attempt_status(obj)
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id',
+            'source',
+            'status',
+            'records_done',
+            'questions_done',
+            'current_quiz',
+            'error',
+            'created_at',
+            'updated_at',
+        ]
+
+
+class LeaderboardEntrySerializer(serializers.ModelSerializer):
+    rank = serializers.IntegerField(read_only=True)
+    username = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta:
+        model = LeaderboardEntry
+        fields = [
+            'rank',
+            'user_id',
+            'username',
+            'attempt_id',
+            'score',
+            'completed_at',
+        ]
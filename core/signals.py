@@ -0,0 +1,101 @@
+import contextlib
+import contextvars
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+
+from .analytics import forget_attempt
+from .grading import get_answer_key
+from .leaderboard import buckets_of, shift_buckets
+from .models import AnswerOption, Attempt, LeaderboardEntry, Question, Quiz, QuizStats
+from .search import restore_triggers
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, **kwargs):
+    if sender.name == 'core':
+        restore_triggers(connections[using])
+
+
+_bumps_deferred = contextvars.ContextVar('quiz_bumps_deferred', default=False)
+
+
+@contextlib.contextmanager
+def defer_version_bumps():
+    """
+    Skip the per-row quiz bumps of question and option writes in the block,
+    for batches that bump the quiz once themselves.
+    """
+    token = _bumps_deferred.set(True)
+    try:
+        yield
+    finally:
+        _bumps_deferred.reset(token)
+
+
+@receiver(post_save, sender=Quiz)
+def quiz_saved(sender, instance, created, **kwargs):
+    if created:
+        QuizStats.objects.create(quiz=instance)
+    else:
+        Quiz.objects.filter(id=instance.id).bump_version()
+
+
+@receiver(post_save, sender=Question)
+def question_saved(sender, instance, created, **kwargs):
+    if _bumps_deferred.get():
+        return
+    if created:
+        Quiz.objects.filter(id=instance.quiz_id).bump_version(questions_count=F('questions_count') + 1)
+    else:
+        Quiz.objects.filter(id=instance.quiz_id).bump_version()
+
+
+@receiver(post_delete, sender=Question)
+def question_deleted(sender, instance, origin=None, **kwargs):
+    # a deleted quiz takes its questions along, there is nothing left to bump
+    if isinstance(origin, Quiz) or _bumps_deferred.get():
+        return
+    Quiz.objects.filter(id=instance.quiz_id).bump_version(questions_count=F('questions_count') - 1)
+
+
+@receiver([post_save, post_delete], sender=AnswerOption)
+def answer_option_changed(sender, instance, origin=None, **kwargs):
+    # cascades from a quiz or question delete are bumped once by their own handlers
+    if isinstance(origin, (Quiz, Question)) or _bumps_deferred.get():
+        return
+    Quiz.objects.filter(questions=instance.question_id).bump_version()
+
+
+@receiver(post_delete, sender=LeaderboardEntry)
+def leaderboard_entry_deleted(sender, instance, origin=None, **kwargs):
+    """
+    Take a deleted entry, with its attempt or user, out of the rank buckets.
+    The user's other attempts are not promoted; rebuild_leaderboard does that.
+    """
+    # a deleted quiz takes its buckets along
+    if isinstance(origin, Quiz):
+        return
+    shift_buckets(buckets_of(instance.quiz_id, instance.score, instance.completed_at), -1)
+
+
+@receiver(pre_delete, sender=Attempt)
+def attempt_deleted(sender, instance, origin=None, **kwargs):
+    # before the delete, while the attempt's answers are still there to count
+    if isinstance(origin, Quiz):
+        return
+    answer_key = get_answer_key(instance.quiz) if instance.completed_at is not None else None
+    forget_attempt(instance, answer_key)
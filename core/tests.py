@@ -1,3 +1,1039 @@
-from django.test import TestCase
+import contextlib
+import csv
+import datetime
+import io
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+from django.utils import timezone
+from django.utils.http import urlencode
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from Quizzy import metrics
+
+from . import leaderboard, urls
+from .analytics import rebuild_quiz_stats
+from .attempts import autosave_answers, finish_attempt, start_attempt, submit_attempt
+from .caching import LocalLRU, set_owner_flag
+from .exporting import filter_attempts, iter_attempt_batches
+from .grading import AnswerKey, _answer_keys
+from .grading_queue import MAX_TRIES, attempt_status, claim_jobs, grade_job, requeue_failed
+from .importing import iter_records
+from .models import (
+    AnswerOption, Attempt, GradingJob, ImportJob, LeaderboardEntry, LeaderboardTimeBucket, Question, Quiz, QuizStats,
+)
+from .sampling import _question_ids
+from .serializers import QuizSerializer
+
+
+class QuizListQueryCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('author', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_quizzes(self, quizzes, questions, options):
+        for i in range(quizzes):
+            owner = User.objects.create_user(f'owner-{quizzes}-{i}')
+            quiz = Quiz.objects.create(title=f'Quiz {i}', description='', owner=owner)
+            for j in range(questions):
+                question = Question.objects.create(quiz=quiz, text=f'Question {j}')
+                for k in range(options):
+                    AnswerOption.objects.create(question=question, answer=f'Option {k}', is_correct=k == 0)
+
+    def test_list_query_count_is_constant(self):
+        self.create_quizzes(quizzes=1, questions=1, options=1)
+        with self.assertNumQueries(4):
+            response = self.client.get('/quizes/')
+        self.assertEqual(response.status_code, 200)
+
+        self.create_quizzes(quizzes=9, questions=5, options=4)
+        with self.assertNumQueries(4):
+            response = self.client.get('/quizes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(response.data['results'][-1]['questions_count'], 5)
+
+    def test_summary_list_does_not_load_questions(self):
+        self.create_quizzes(quizzes=3, questions=5, options=2)
+        with self.assertNumQueries(1):
+            response = self.client.get('/quizes/?view=summary&pagination=cursor')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('questions', response.data['results'][0])
+        self.assertEqual(response.data['results'][0]['questions_count'], 5)
+
+    def test_detail_query_count_is_constant(self):
+        self.create_quizzes(quizzes=1, questions=20, options=4)
+        quiz = Quiz.objects.get()
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/quizes/{quiz.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['questions_count'], 20)
+        self.assertEqual(len(response.json()['questions'][0]['options']), 4)
+
+    def test_detail_revalidation_skips_serialization(self):
+        self.create_quizzes(quizzes=1, questions=20, options=4)
+        quiz = Quiz.objects.get()
+        etag = self.client.get(f'/quizes/{quiz.pk}/')['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/quizes/{quiz.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        AnswerOption.objects.filter(question__quiz=quiz).first().delete()
+        response = self.client.get(f'/quizes/{quiz.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('author', password='password')
+        self.student = User.objects.create_user('student', password='password')
+        self.quiz = Quiz.objects.create(title='Quiz', description='', owner=self.owner, is_active=True)
+        Question.objects.bulk_create_with_options(self.quiz, [
+            {'text': 'Question', 'options': [{'answer': 'Right', 'is_correct': True}]},
+        ])
+        self.client = APIClient()
+
+    def get(self, user, url=None):
+        self.client.force_authenticate(user)
+        response = self.client.get(url or f'/quizes/{self.quiz.pk}/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cached_body_skips_the_serializer_and_flags_the_owner(self):
+        self.assertFalse(self.get(self.student)['is_owner'])
+        with mock.patch.object(QuizSerializer, 'to_representation') as serialize:
+            owned = self.get(self.owner)
+            self.assertFalse(self.get(self.student)['is_owner'])
+        serialize.assert_not_called()
+        self.assertTrue(owned['is_owner'])
+        self.assertEqual(owned['questions'][0]['text'], 'Question')
+
+        cache.clear()
+        self.assertTrue(self.get(self.owner)['is_owner'])
+        with mock.patch.object(QuizSerializer, 'to_representation') as serialize:
+            self.assertFalse(self.get(self.student)['is_owner'])
+            self.assertTrue(self.get(self.owner)['is_owner'])
+        serialize.assert_not_called()
+
+    def test_question_and_option_writes_move_to_a_new_key(self):
+        questions_url = f'/quizes/{self.quiz.pk}/questions/'
+        self.get(self.student)
+        self.get(self.student, questions_url)
+
+        Question.objects.create(quiz=self.quiz, text='Another')
+        self.assertEqual(self.get(self.student)['questions_count'], 2)
+        self.assertEqual(self.get(self.student, questions_url)['count'], 2)
+
+        option = AnswerOption.objects.get(question__quiz=self.quiz)
+        option.answer = 'Changed'
+        option.save()
+        self.assertEqual(self.get(self.student)['questions'][0]['options'][0]['answer'], 'Changed')
+
+    def test_inactive_quizzes_are_not_cached(self):
+        Quiz.objects.filter(pk=self.quiz.pk).update(is_active=False)
+        with mock.patch.object(QuizSerializer, 'to_representation', return_value={'is_owner': False}) as serialize:
+            self.get(self.student)
+            self.get(self.student)
+        self.assertEqual(serialize.call_count, 2)
+
+    def test_owner_flag_follows_the_renderer_separators(self):
+        for compact in (True, False):
+            with self.subTest(compact=compact):
+                renderer = JSONRenderer()
+                renderer.compact = compact
+                body = renderer.render({'id': 1, 'title': '"is_owner":false', 'is_owner': False})
+                self.assertEqual(
+                    json.loads(set_owner_flag(body, 'is_owner', renderer)),
+                    {'id': 1, 'title': '"is_owner":false', 'is_owner': True},
+                )
+
+
+class LocalLRUTests(SimpleTestCase):
+    def test_keeps_the_most_recently_used_items(self):
+        items = LocalLRU(2)
+        items['a'] = 1
+        items['b'] = 2
+        self.assertEqual(items.get('a'), 1)
+        items['c'] = 3
+        self.assertEqual(len(items), 2)
+        self.assertIsNone(items.get('b'))
+        self.assertEqual((items.get('a'), items.get('c')), (1, 3))
+
+
+class QuizStartTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('student', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.quiz = Quiz.objects.create(title='Quiz', description='', owner=self.user, is_active=True)
+
+    def test_start_is_idempotent(self):
+        response = self.client.post(f'/quizes/{self.quiz.pk}/start/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['answers'], [])
+
+        again = self.client.post(f'/quizes/{self.quiz.pk}/start/')
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json()['id'], response.json()['id'])
+
+    def test_new_attempt_skips_answers_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f'/quizes/{self.quiz.pk}/start/')
+        self.assertEqual(response.status_code, 201)
+        self.assertLessEqual(len(queries), 5)
+        self.assertFalse(any('core_useranswer' in query['sql'] for query in queries))
+
+
+class AttemptResultTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('student', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.quiz = Quiz.objects.create(title='Quiz', description='', owner=self.user, is_active=True)
+        self.question = Question.objects.create(quiz=self.quiz, text='Question')
+        self.option = AnswerOption.objects.create(question=self.question, answer='Right', is_correct=True)
+
+    def test_finished_attempt_keeps_its_result(self):
+        self.client.post(f'/quizes/{self.quiz.pk}/start/')
+        finished = self.client.post(f'/quizes/{self.quiz.pk}/finish/', {
+            'answers': [{'question_id': self.question.pk, 'option_id': self.option.pk}],
+        }, format='json')
+        self.assertEqual(finished.status_code, 200)
+
+        Quiz.objects.filter(pk=self.quiz.pk).update(title='Renamed')
+        Question.objects.filter(pk=self.question.pk).update(text='Reworded')
+        AnswerOption.objects.filter(pk=self.option.pk).update(answer='Changed', is_correct=False)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/quizes/attempts/{finished.json()["id"]}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'completed')
+        self.assertEqual({key: response.data[key] for key in finished.json()}, finished.json())
+        self.assertEqual(response.data['quiz_title'], 'Quiz')
+        self.assertEqual(response.data['answers'], [
+            {'question_text': 'Question', 'selected_answer': 'Right', 'is_correct': True},
+        ])
+
+    def test_score_follows_options_changed_before_finishing(self):
+        self.question.score = 5
+        self.question.save()
+        wrong = AnswerOption.objects.create(question=self.question, answer='Wrong')
+        url = f'/quizes/{self.quiz.pk}/attempt/answers/'
+        self.client.post(f'/quizes/{self.quiz.pk}/start/')
+        self.client.put(url, {'answers': [{'question_id': self.question.pk, 'option_id': self.option.pk}]}, format='json')
+
+        self.option.is_correct = False
+        self.option.save()
+        self.client.put(url, {'answers': [{'question_id': self.question.pk, 'option_id': wrong.pk}]}, format='json')
+        finished = self.client.post(f'/quizes/{self.quiz.pk}/finish/', format='json')
+        self.assertEqual(finished.json()['score'], 0)
+        self.assertEqual(finished.json()['answers'][0]['is_correct'], False)
+
+    def test_autosave_rejects_missing_quizzes_and_bad_bodies(self):
+        self.client.post(f'/quizes/{self.quiz.pk}/start/')
+        self.assertEqual(self.client.put('/quizes/0/attempt/answers/', {'answers': []}, format='json').status_code, 404)
+        response = self.client.put(f'/quizes/{self.quiz.pk}/attempt/answers/', [1, 2], format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_finish_rejects_missing_quizzes_and_bad_bodies(self):
+        self.client.post(f'/quizes/{self.quiz.pk}/start/')
+        url = f'/quizes/{self.quiz.pk}/finish/'
+        self.assertEqual(self.client.post('/quizes/0/finish/', {'answers': []}, format='json').status_code, 404)
+        for body in ([1, 2], {'answers': 5}, {'answers': 'abc'}):
+            with self.subTest(body=body):
+                self.assertEqual(self.client.post(url, body, format='json').status_code, 400)
+        with self.settings(QUIZ_DEFERRED_GRADING=True):
+            self.assertEqual(self.client.post(url, {'answers': 'abc'}, format='json').status_code, 400)
+        self.assertFalse(GradingJob.objects.exists())
+
+        answers = [{'question_id': self.question.pk, 'option_id': self.option.pk}]
+        finished = self.client.post(url, {'answers': answers}, format='json')
+        self.assertEqual((finished.status_code, finished.json()['score']), (200, 1))
+
+
+class OwnershipTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('author', password='password')
+        self.quiz = Quiz.objects.create(title='Quiz', description='', owner=self.owner)
+        self.question = Question.objects.create(quiz=self.quiz, text='Question')
+        self.option = AnswerOption.objects.create(question=self.question, answer='Right', is_correct=True)
+        self.client = APIClient()
+
+    def test_only_the_owner_writes(self):
+        self.client.force_authenticate(User.objects.create_user('student', password='password'))
+        options = f'/quizes/{self.quiz.pk}/questions/{self.question.pk}/options/'
+        self.assertEqual(self.client.post(options, {'answer': 'Wrong'}, format='json').status_code, 403)
+        self.assertEqual(self.client.patch(f'{options}{self.option.pk}/', {'answer': 'Wrong'}).status_code, 403)
+        self.assertEqual(self.client.delete(f'/quizes/{self.quiz.pk}/questions/{self.question.pk}/').status_code, 403)
+
+    def test_question_must_belong_to_the_quiz(self):
+        self.client.force_authenticate(self.owner)
+        other = Quiz.objects.create(title='Other', description='', owner=self.owner)
+        options = f'/quizes/{other.pk}/questions/{self.question.pk}/options/'
+        self.assertEqual(self.client.post(options, {'answer': 'Wrong'}, format='json').status_code, 404)
+        self.assertEqual(self.client.patch(f'{options}{self.option.pk}/', {'answer': 'Wrong'}).status_code, 404)
+        self.assertEqual(self.client.post('/quizes/0/questions/', {'text': 'New', 'options': []}, format='json').status_code, 404)
+
+
+class QuestionBatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('author', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.quiz = Quiz.objects.create(title='Quiz', description='', owner=self.user)
+        self.question = Question.objects.create(quiz=self.quiz, text='Question')
+        self.option = AnswerOption.objects.create(question=self.question, answer='Right', is_correct=True)
+        self.url = f'/quizes/{self.quiz.pk}/questions/batch/'
+
+    def test_batch_applies_every_operation_with_one_bump(self):
+        version = Quiz.objects.get(pk=self.quiz.pk).content_version
+        response = self.client.post(self.url, {'operations': [
+            {'op': 'create', 'text': 'New', 'score': 2, 'options': [{'answer': 'Yes', 'is_correct': True}]},
+            {'op': 'update', 'id': self.question.pk, 'text': 'Changed'},
+            {'op': 'create', 'type': 'option', 'question_id': self.question.pk, 'answer': 'Wrong'},
+            {'op': 'delete', 'type': 'option', 'id': self.option.pk},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['status'] for r in response.data['results']], ['created', 'updated', 'created', 'deleted'])
+
+        quiz = Quiz.objects.get(pk=self.quiz.pk)
+        self.assertEqual(quiz.content_version, version + 1)
+        self.assertEqual(quiz.questions_count, 2)
+        self.assertEqual(Question.objects.get(pk=self.question.pk).text, 'Changed')
+        self.assertEqual(list(self.question.options.values_list('answer', flat=True)), ['Wrong'])
+        self.assertEqual(Question.objects.get(pk=response.data['results'][0]['id']).options.get().answer, 'Yes')
+
+    def test_invalid_batch_writes_nothing(self):
+        other = Question.objects.create(quiz=Quiz.objects.create(title='Other', description='', owner=self.user))
+        response = self.client.post(self.url, {'operations': [
+            {'op': 'update', 'id': self.question.pk, 'text': 'Changed'},
+            {'op': 'delete', 'id': other.pk},
+            {'op': 'update', 'type': 'option', 'id': self.option.pk, 'is_correct': 'maybe'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([r['status'] for r in response.data['results']], ['skipped', 'invalid', 'invalid'])
+        self.assertEqual(Question.objects.get(pk=self.question.pk).text, 'Question')
+        self.assertTrue(Question.objects.filter(pk=other.pk).exists())
+
+
+class ImportTests(TestCase):
+    def test_iter_records_reads_arrays_objects_and_lines(self):
+        records = [{'title': 'A', 'questions': [{'text': 'Q', 'options': []}]}, {'title': 'B "[1, 2]"'}]
+        for text in (json.dumps(records), '\n'.join(json.dumps(record) for record in records)):
+            self.assertEqual(list(iter_records(io.StringIO(text), read_size=3)), records)
+        self.assertEqual(list(iter_records(io.StringIO(json.dumps(records[0])))), records[:1])
+        self.assertEqual(list(iter_records(io.StringIO(''))), [])
+
+    def test_iter_records_rejects_truncated_input(self):
+        for text in ('[{"title": "A"}, {"title": "B"', '{"title": "A"} {"tit'):
+            with self.assertRaises(json.JSONDecodeError):
+                list(iter_records(io.StringIO(text), read_size=4))
+
+    def test_failed_import_resumes_with_job(self):
+        owner = User.objects.create_user('author')
+        questions = [{'text': f'Question {i}', 'options': [{'answer': 'Right', 'is_correct': True}]} for i in range(5)]
+        broken = [*questions[:3], {'options': []}, *questions[4:]]
+        records = [{'title': 'First', 'description': 'First'}, {'title': 'Second', 'description': 'Second'}]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'quizzes.jsonl')
+            with open(path, 'w') as stream:
+                stream.write('\n'.join(json.dumps(record) for record in [records[0], {**records[1], 'questions': broken}]))
+            with self.assertRaises(CommandError):
+                call_command('import_quizzes', path, owner='author', chunk_size=2, stdout=io.StringIO())
+            job = ImportJob.objects.get()
+            self.assertEqual((job.status, job.records_done, job.questions_done), (ImportJob.STATUS_FAILED, 1, 2))
+
+            with open(path, 'w') as stream:
+                stream.write('\n'.join(json.dumps(record) for record in [records[0], {**records[1], 'questions': questions}]))
+            call_command('import_quizzes', path, job=job.pk, chunk_size=2, stdout=io.StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.records_done), (ImportJob.STATUS_COMPLETED, 2))
+        self.assertEqual(list(Quiz.objects.filter(owner=owner).order_by('pk').values_list('title', flat=True)),
+                         ['First', 'Second'])
+        second = Quiz.objects.get(title='Second')
+        self.assertEqual(list(second.questions.values_list('text', flat=True)), [q['text'] for q in questions])
+        self.assertEqual(second.questions_count, 5)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        _answer_keys.clear()
+        self.owner = User.objects.create_user('author')
+        self.quiz = Quiz.objects.create(title='Quiz', description='', owner=self.owner, is_active=True)
+        questions = Question.objects.bulk_create_with_options(self.quiz, [
+            {'text': f'Question {i}', 'options': [
+                {'answer': 'Right', 'is_correct': True}, {'answer': 'Wrong', 'is_correct': False},
+            ]}
+            for i in range(2)
+        ])
+        right = [{'question_id': q.pk, 'option_id': q.options.get(is_correct=True).pk} for q in questions]
+        wrong = {'question_id': questions[0].pk, 'option_id': questions[0].options.get(is_correct=False).pk}
+        for i, answers in enumerate([[wrong], right[:1], right]):
+            player = User.objects.create_user(f'player-{i}')
+            start_attempt(self.quiz, player)
+            finish_attempt(self.quiz, player, answers)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_attempts_csv(self):
+        response = self.client.get(f'/quizes/{self.quiz.pk}/export/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], ['attempt_id', 'quiz_id', 'user_id', 'username', 'started_at', 'completed_at', 'score'])
+        self.assertEqual([(row[3], row[6]) for row in rows[1:]], [('player-0', '0'), ('player-1', '1'), ('player-2', '2')])
+
+    def test_answers_jsonl_in_batches(self):
+        response = self.client.get(f'/quizes/{self.quiz.pk}/export/', {'kind': 'answers', 'output': 'jsonl'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([(row['username'], row['is_correct']) for row in rows],
+                         [('player-0', False), ('player-1', True), ('player-2', True), ('player-2', True)])
+        batches = list(iter_attempt_batches(filter_attempts(self.quiz.pk), batch_size=2))
+        self.assertEqual([len(batch) for batch in batches], [2, 1])
+
+    def test_filters_and_errors(self):
+        url = f'/quizes/{self.quiz.pk}/export/'
+        future = (timezone.now() + datetime.timedelta(days=1)).date().isoformat()
+        self.assertEqual(b''.join(self.client.get(url, {'since': future}).streaming_content).count(b'\n'), 1)
+        self.assertEqual(self.client.get(url, {'since': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'kind': 'scores'}).status_code, 400)
+        self.client.force_authenticate(User.objects.get(username='player-0'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_command_writes_the_same_rows(self):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            call_command('export_results', quiz=self.quiz.pk, kind='answers', output_format='jsonl')
+        self.assertEqual(len(stdout.getvalue().splitlines()), 4)
+
+
+class QuizStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        _answer_keys.clear()
+        self.owner = User.objects.create_user('author', password='password')
+        self.quiz = Quiz.objects.create(title='Quiz', description='', owner=self.owner, is_active=True)
+        self.questions = Question.objects.bulk_create_with_options(self.quiz, [
+            {'text': f'Question {i}', 'score': i + 1, 'options': [
+                {'answer': 'Right', 'is_correct': True}, {'answer': 'Wrong'},
+            ]}
+            for i in range(3)
+        ])
+        self.client = APIClient()
+
+    def play(self, username, correct, finish=True):
+        user = User.objects.create_user(username)
+        self.client.force_authenticate(user)
+        self.client.post(f'/quizes/{self.quiz.pk}/start/')
+        if finish:
+            answers = [
+                {'question_id': question.pk, 'option_id': question.options.get(is_correct=i < correct).pk}
+                for i, question in enumerate(self.questions)
+            ]
+            self.assertEqual(self.client.post(f'/quizes/{self.quiz.pk}/finish/', {'answers': answers}, format='json')
+                             .status_code, 200)
+        return user
+
+    def assert_stats_match_a_rebuild(self):
+        self.client.force_authenticate(self.owner)
+        url = f'/quizes/{self.quiz.pk}/stats/'
+        counted = self.client.get(url).json()
+        rebuild_quiz_stats(self.quiz, AnswerKey.compile(self.quiz))
+        rebuilt = self.client.get(url).json()
+        # the rebuild leaves out the scores and options no attempt has left
+        counted['score_distribution'] = [row for row in counted['score_distribution'] if row['count']]
+        self.assertEqual(counted, rebuilt)
+        return rebuilt
+
+    def test_counters_match_a_rebuild_after_finishes_and_deletes(self):
+        players = [self.play(f'player-{correct}', correct) for correct in range(4)]
+        self.play('player-open', 0, finish=False)
+        report = self.assert_stats_match_a_rebuild()
+        self.assertEqual((report['attempts_count'], report['completed_count']), (5, 4))
+        self.assertEqual(sum(row['count'] for row in report['score_distribution']), 4)
+
+        players[3].delete()
+        Attempt.objects.filter(user=players[1]).delete()
+        Attempt.objects.filter(user__username='player-open').delete()
+        report = self.assert_stats_match_a_rebuild()
+        self.assertEqual((report['attempts_count'], report['completed_count']), (2, 2))
+        self.assertEqual(Quiz.objects.get(pk=self.quiz.pk).stats.attempts_count, 2)
+
+
+class GradingQueueTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('student')
+        self.quiz = Quiz.objects.create(title='Quiz', description='', owner=self.user, is_active=True)
+        question = Question.objects.create(quiz=self.quiz, text='Question')
+        option = AnswerOption.objects.create(question=question, answer='Right', is_correct=True)
+        start_attempt(self.quiz, self.user)
+        self.attempt = submit_attempt(self.quiz, self.user, [{'question_id': question.pk, 'option_id': option.pk}])
+
+    def expire_leases(self):
+        GradingJob.objects.update(locked_until=timezone.now() - datetime.timedelta(seconds=1))
+
+    def test_lease_keeps_other_workers_out(self):
+        token, jobs = claim_jobs()
+        self.assertEqual(len(jobs), 1)
+        self.assertEqual(claim_jobs(), ('', []))
+        self.assertTrue(grade_job(jobs[0], token))
+        self.assertEqual(Attempt.objects.get(pk=self.attempt.pk).score, 1)
+
+    def test_expired_lease_is_graded_once(self):
+        first, (stale,) = claim_jobs()
+        self.expire_leases()
+        second, (job,) = claim_jobs()
+        self.assertTrue(grade_job(job, second))
+        # the first worker wakes up after losing its lease
+        self.assertFalse(grade_job(stale, first))
+        self.assertEqual(QuizStats.objects.get(quiz=self.quiz).completed_count, 1)
+        self.assertEqual(GradingJob.objects.get().tries, 2)
+
+    def test_job_killing_its_workers_fails_after_max_tries(self):
+        for _ in range(MAX_TRIES):
+            self.assertEqual(len(claim_jobs()[1]), 1)
+            # the worker dies without releasing the job
+            self.expire_leases()
+        self.assertEqual(claim_jobs(), ('', []))
+        self.assertEqual(GradingJob.objects.get().status, GradingJob.STATUS_FAILED)
+        self.assertEqual(attempt_status(Attempt.objects.select_related('grading_job').get()), 'failed')
+
+        requeue_failed()
+        token, (job,) = claim_jobs()
+        self.assertTrue(grade_job(job, token))
+        self.assertIsNotNone(Attempt.objects.get().completed_at)
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        self.quiz = Quiz.objects.create(title='Quiz', description='', owner=User.objects.create_user('author'))
+        self.start = datetime.datetime(2026, 1, 1, 23, tzinfo=datetime.timezone.utc)
+        self.users = [User.objects.create_user(f'player-{i}') for i in range(9)]
+
+    def finish(self, user, score, seconds):
+        attempt = Attempt.objects.create(
+            quiz=self.quiz, user=user, score=score, completed_at=self.start + datetime.timedelta(seconds=seconds),
+        )
+        leaderboard.record_attempt(attempt)
+        return attempt
+
+    def create_entries(self):
+        # ties on 3 points on both sides of midnight, in one minute, one second and on the same instant
+        self.finish(self.users[0], 3, 7200)
+        self.finish(self.users[1], 3, 0)
+        self.finish(self.users[2], 5, 3600)
+        self.finish(self.users[3], 3, 7200)
+        self.finish(self.users[4], 1, 0)
+        self.finish(self.users[5], 3, 3600)
+        self.finish(self.users[6], 3, 3659)
+        self.finish(self.users[7], 3, 3661)
+        self.finish(self.users[8], 3, 3659.5)
+        # a worse attempt is ignored, a better one replaces the entry
+        self.finish(self.users[2], 4, 10800)
+        self.finish(self.users[4], 4, 10800)
+
+    def assert_ranks(self):
+        ordered = list(LeaderboardEntry.objects.filter(quiz=self.quiz).order_by('-score', 'completed_at', 'attempt_id'))
+        self.assertEqual([entry for _, entry in leaderboard.top(self.quiz.pk, 3)], ordered[:3])
+        for rank, entry in enumerate(ordered, start=1):
+            self.assertEqual(leaderboard.rank_of(self.quiz.pk, entry.score, entry.completed_at, entry.attempt_id), rank)
+        return [entry.user for entry in ordered]
+
+    def test_ranks_break_ties_by_completion(self):
+        self.create_entries()
+        users = self.users
+        self.assertEqual(self.assert_ranks(), [
+            users[2], users[4], users[1], users[5], users[6], users[8], users[7], users[0], users[3],
+        ])
+
+        buckets = LeaderboardTimeBucket.objects.filter(quiz=self.quiz, entries_count__gt=0)
+        counted = list(buckets.values_list('score', 'span', 'start', 'entries_count'))
+        leaderboard.rebuild_leaderboard(self.quiz)
+        self.assertEqual(self.assert_ranks(), [
+            users[2], users[4], users[1], users[5], users[6], users[8], users[7], users[0], users[3],
+        ])
+        self.assertEqual(list(buckets.values_list('score', 'span', 'start', 'entries_count')), counted)
+
+    def test_deleted_entries_leave_the_ranks(self):
+        self.create_entries()
+        self.users[2].delete()
+        Attempt.objects.get(user=self.users[1]).delete()
+        users = self.users
+        self.assertEqual(self.assert_ranks(), [users[4], users[5], users[6], users[8], users[7], users[0], users[3]])
+
+        self.quiz.delete()
+        self.assertFalse(LeaderboardTimeBucket.objects.exists())
+
+    def test_rank_endpoint(self):
+        self.create_entries()
+        client = APIClient()
+        client.force_authenticate(self.users[5])
+        url = f'/quizes/{self.quiz.pk}/leaderboard/'
+        self.assertEqual([entry['rank'] for entry in client.get(url, {'limit': 2}).data['results']], [1, 2])
+        self.assertEqual(client.get(f'{url}me/').data['rank'], 4)
+        self.assertEqual(client.get(f'{url}me/', {'attempt': 'abc'}).status_code, 400)
+        self.assertEqual(client.get(f'{url}me/', {'attempt': 0}).status_code, 404)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('author', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_question_search_follows_writes(self):
+        quiz = Quiz.objects.create(title='Quiz', description='', owner=self.user, is_active=True)
+        first, second = Question.objects.bulk_create_with_options(quiz, [
+            {'text': 'What is the capital of France?'}, {'text': 'Name a prime number'},
+        ])
+        url = f'/quizes/{quiz.pk}/questions/?search='
+        self.assertEqual([q['id'] for q in self.client.get(url + 'capit fran').json()['results']], [first.pk])
+
+        Question.objects.filter(pk=first.pk).update(text='What is the capital of Italy?')
+        second.delete()
+        self.assertEqual(self.client.get(url + 'france').json()['count'], 0)
+        self.assertEqual(self.client.get(url + 'italy').json()['count'], 1)
+        self.assertEqual(self.client.get(url + 'prime').json()['count'], 0)
+
+    def test_quiz_search_ranks_title_matches_first(self):
+        in_description = Quiz.objects.create(title='History', description='Dates of famous battles', owner=self.user)
+        in_title = Quiz.objects.create(title='Famous battles', description='History', owner=self.user)
+        Quiz.objects.create(title='Chemistry', description='Elements', owner=self.user)
+
+        response = self.client.get('/quizes/search/?q=battles')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([quiz['id'] for quiz in response.data['results']], [in_title.pk, in_description.pk])
+        self.assertGreater(response.data['results'][0]['relevance'], response.data['results'][1]['relevance'])
+        self.assertEqual(self.client.get('/quizes/search/?q=%22').data['count'], 0)
+
+
+class SamplingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        _question_ids.clear()
+        _answer_keys.clear()
+        self.user = User.objects.create_user('student', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_quiz(self, questions, **fields):
+        quiz = Quiz.objects.create(title='Pool', description='', owner=self.user, is_active=True, **fields)
+        Question.objects.bulk_create_with_options(quiz, [
+            {'text': f'Question {i}', 'options': [{'answer': f'Option {j}', 'is_correct': j == 0} for j in range(4)]}
+            for i in range(questions)
+        ])
+        return Quiz.objects.get(pk=quiz.pk)
+
+    def test_attempt_is_asked_and_graded_on_its_draw(self):
+        quiz = self.create_quiz(10, sample_size=3, shuffle_options=True)
+        drawn = self.client.post(f'/quizes/{quiz.pk}/start/').json()['question_ids']
+        self.assertEqual(len(set(drawn)), 3)
+        self.assertLessEqual(set(drawn), set(quiz.questions.values_list('pk', flat=True)))
+
+        asked = self.client.get(f'/quizes/{quiz.pk}/attempt/questions/').data
+        self.assertEqual([question['id'] for question in asked], drawn)
+        self.assertEqual(self.client.get(f'/quizes/{quiz.pk}/attempt/questions/').data, asked)
+        self.assertNotIn('is_correct', asked[0]['options'][0])
+
+        answers = [
+            {'question_id': question.pk, 'option_id': question.options.get(is_correct=True).pk}
+            for question in quiz.questions.all()
+        ]
+        response = self.client.post(f'/quizes/{quiz.pk}/finish/', {'answers': answers}, format='json')
+        self.assertEqual(response.json()['score'], 3)
+        self.assertEqual(len(response.json()['answers']), 3)
+        self.assertIsNone(self.client.get(f'/quizes/{quiz.pk}/stats/').data['max_score'])
+
+    def test_attempt_passes_on_the_questions_it_was_asked(self):
+        quiz = self.create_quiz(4, sample_size=2)
+        first, *rest = quiz.questions.all()
+        first.score = 5
+        first.save()
+        quiz.refresh_from_db()
+        attempt_id = self.client.post(f'/quizes/{quiz.pk}/start/').json()['id']
+        Attempt.objects.filter(pk=attempt_id).update(question_ids=[rest[0].pk, rest[1].pk])
+
+        answers = [
+            {'question_id': question.pk, 'option_id': question.options.get(is_correct=True).pk}
+            for question in rest[:2]
+        ]
+        response = self.client.post(f'/quizes/{quiz.pk}/finish/', {'answers': answers}, format='json')
+        self.assertEqual(response.json()['score'], 2)
+        self.assertEqual(self.client.get(f'/quizes/{quiz.pk}/stats/').data['passed_count'], 1)
+
+        rebuild_quiz_stats(quiz, AnswerKey.compile(quiz))
+        self.assertEqual(self.client.get(f'/quizes/{quiz.pk}/stats/').data['passed_count'], 1)
+
+    def test_start_cost_does_not_grow_with_the_pool(self):
+        counts = []
+        for size in (5, 200):
+            quiz = self.create_quiz(size, sample_size=3)
+            for first in (True, False):
+                self.client.force_authenticate(User.objects.create_user(f'player-{size}-{first}'))
+                with CaptureQueriesContext(connection) as queries:
+                    self.assertEqual(self.client.post(f'/quizes/{quiz.pk}/start/').status_code, 201)
+                counts.append(len(queries))
+                self.assertFalse(any('RANDOM()' in query['sql'] for query in queries))
+        # the question ids are read once per quiz version
+        self.assertEqual(counts, [counts[0], counts[0] - 1] * 2)
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('author', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def scrape(self, **extra):
+        response = self.client.get('/metrics', **extra)
+        return response.status_code, response.content.decode()
+
+    def test_server_timing_header(self):
+        response = self.client.get('/quizes/')
+        self.assertEqual(response.status_code, 200)
+        db, serialize, total = response['Server-Timing'].split(', ')
+        self.assertRegex(db, r'^db;dur=[\d.]+;desc="\d+ queries"$')
+        self.assertRegex(serialize, r'^serialize;dur=[\d.]+$')
+        self.assertRegex(total, r'^total;dur=[\d.]+$')
+
+    def test_histograms_are_cumulative(self):
+        histogram = metrics.Histogram('test_seconds', 'Test.', (0.1, 1), ('view', 'method'))
+        for value in (0.05, 0.5, 0.7, 3):
+            histogram.observe(value, 'quiz-list', 'GET')
+        self.assertEqual(histogram.expose().splitlines(), [
+            '# HELP test_seconds Test.',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{view="quiz-list",method="GET",le="0.1"} 1',
+            'test_seconds_bucket{view="quiz-list",method="GET",le="1"} 3',
+            'test_seconds_bucket{view="quiz-list",method="GET",le="+Inf"} 4',
+            'test_seconds_sum{view="quiz-list",method="GET"} 4.25',
+            'test_seconds_count{view="quiz-list",method="GET"} 4',
+        ])
+
+    def test_exposition_labels_requests_by_route(self):
+        self.client.get('/quizes/')
+        self.client.get('/no-such-page/')
+        status_code, body = self.scrape()
+        self.assertEqual(status_code, 200)
+        for view in ('quiz-list', metrics.UNRESOLVED):
+            count = f'quizzy_request_duration_seconds_count{{view="{view}",method="GET"}} '
+            self.assertIn(count, body)
+            inf = f'quizzy_request_duration_seconds_bucket{{view="{view}",method="GET",le="+Inf"}} '
+            self.assertEqual(body.split(inf)[1].split()[0], body.split(count)[1].split()[0])
+        self.assertNotIn('view="metrics"', body)
+
+    def test_only_allowed_addresses_scrape(self):
+        self.assertEqual(self.scrape(REMOTE_ADDR='10.0.0.1')[0], 404)
+        with self.settings(METRICS_ALLOWED_IPS=['10.0.0.1']):
+            self.assertEqual(self.scrape(REMOTE_ADDR='10.0.0.1')[0], 200)
+
+    def test_requests_over_the_query_threshold_log_their_sql(self):
+        with self.settings(METRICS_QUERY_LOG_THRESHOLD=0):
+            with self.assertLogs('quizzy.metrics', 'WARNING') as logs:
+                self.client.get('/quizes/')
+        self.assertIn('GET /quizes/ (quiz-list) ran', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+        with self.settings(METRICS_QUERY_LOG_THRESHOLD=100):
+            with self.assertNoLogs('quizzy.metrics', 'WARNING'):
+                self.client.get('/quizes/')
+
+    def test_uninstall_restores_the_serializer_data_property(self):
+        self.client.get('/quizes/')
+        self.assertTrue(hasattr(serializers.Serializer.data.fget, 'untimed'))
+        try:
+            metrics.uninstall()
+            self.assertFalse(hasattr(serializers.Serializer.data.fget, 'untimed'))
+            self.assertFalse(hasattr(serializers.ListSerializer.data.fget, 'untimed'))
+        finally:
+            metrics.install()
+        metrics.install()
+        self.assertFalse(hasattr(serializers.Serializer.data.fget.untimed.fget, 'untimed'))
+
+
+class AdminChangelistTests(TestCase):
+    changelists = ('quiz', 'question', 'answeroption', 'attempt', 'useranswer')
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='password'))
+
+    def create_attempts(self, size):
+        owner = User.objects.create_user(f'owner-{size}')
+        quiz = Quiz.objects.create(title=f'Quiz {size}', description='', owner=owner, is_active=True)
+        questions = Question.objects.bulk_create_with_options(quiz, [
+            {'text': f'Question {i}', 'options': [{'answer': 'Right', 'is_correct': True}]} for i in range(size)
+        ])
+        answers = [{'question_id': question.pk, 'option_id': question.options.get().pk} for question in questions]
+        for i in range(size):
+            player = User.objects.create_user(f'player-{size}-{i}')
+            start_attempt(quiz, player)
+            finish_attempt(quiz, player, answers)
+
+    def count_queries(self):
+        counts = {}
+        for name in self.changelists:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(f'/admin/core/{name}/?o=1')
+            self.assertEqual(response.status_code, 200)
+            counts[name] = len(queries)
+        return counts
+
+    def test_changelist_query_count_is_constant(self):
+        self.create_attempts(2)
+        small = self.count_queries()
+        self.create_attempts(8)
+        self.assertEqual(self.count_queries(), small)
+
+
+class ConcurrentQuizStartTests(TransactionTestCase):
+    threads = 16
+
+    def test_concurrent_starts_create_one_attempt(self):
+        user = User.objects.create_user('student', password='password')
+        quiz = Quiz.objects.create(title='Quiz', description='', owner=user, is_active=True)
+        barrier = Barrier(self.threads)
+
+        def start(_):
+            client = APIClient()
+            client.force_authenticate(user)
+            barrier.wait()
+            try:
+                return client.post(f'/quizes/{quiz.pk}/start/')
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            responses = list(executor.map(start, range(self.threads)))
+
+        self.assertEqual(sorted(r.status_code for r in responses), [200] * (self.threads - 1) + [201])
+        self.assertEqual(len({r.json()['id'] for r in responses}), 1)
+        self.assertEqual(Attempt.objects.filter(quiz=quiz, user=user, completed_at__isnull=True).count(), 1)
+
+
+# ROOT_URLCONF of AsyncViewTests: the async views under /quizes/, the sync ones under /sync/
+urlpatterns = [
+    path('quizes/', include(urls.async_urlpatterns)),
+    path('sync/', include(urls.sync_urlpatterns)),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncViewTests(TestCase):
+    """The async views, logged in through a session as under ASGI."""
+
+    def setUp(self):
+        cache.clear()
+        _answer_keys.clear()
+        self.user = User.objects.create_user('student', password='password')
+        self.quiz = Quiz.objects.create(title='Quiz', description='', owner=self.user, is_active=True)
+        self.questions = Question.objects.bulk_create_with_options(self.quiz, [
+            {'text': f'Question {i}', 'options': [{'answer': 'Right', 'is_correct': True}, {'answer': 'Wrong'}]}
+            for i in range(12)
+        ])
+        self.answers = [
+            {'question_id': question.pk, 'option_id': question.options.get(is_correct=True).pk}
+            for question in self.questions
+        ]
+
+    async def test_attempt_is_started_saved_and_finished(self):
+        url = f'/quizes/{self.quiz.pk}/'
+        self.assertEqual((await self.async_client.post(url + 'start/')).status_code, 403)
+
+        await self.async_client.aforce_login(self.user)
+        started = await self.async_client.post(url + 'start/')
+        self.assertEqual(started.status_code, 201)
+        again = await self.async_client.post(url + 'start/')
+        self.assertEqual((again.status_code, again.json()['id']), (200, started.json()['id']))
+
+        answers_url = url + 'attempt/answers/'
+        missing = await self.async_client.put('/quizes/0/attempt/answers/', {}, content_type='application/json')
+        self.assertEqual(missing.status_code, 404)
+        invalid = await self.async_client.put(answers_url, [1, 2], content_type='application/json')
+        self.assertEqual(invalid.status_code, 400)
+        saved = await self.async_client.put(answers_url, {'answers': self.answers[:2]}, content_type='application/json')
+        self.assertEqual(saved.json()['saved'], [answer['question_id'] for answer in self.answers[:2]])
+
+        for body in ([1, 2], {'answers': 'abc'}):
+            invalid = await self.async_client.post(url + 'finish/', body, content_type='application/json')
+            self.assertEqual(invalid.status_code, 400)
+        finished = await self.async_client.post(url + 'finish/', {'answers': self.answers}, content_type='application/json')
+        self.assertEqual(finished.status_code, 200)
+        self.assertEqual(finished.json()['score'], 12)
+
+    async def test_quiz_detail_is_cached_and_revalidated(self):
+        await self.async_client.aforce_login(self.user)
+        url = f'/quizes/{self.quiz.pk}/'
+        response = await self.async_client.get(url)
+        self.assertEqual(response.json()['questions_count'], 12)
+        self.assertTrue(response.json()['is_owner'])
+        self.assertEqual((await self.async_client.get(url)).json(), response.json())
+
+        revalidated = await self.async_client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+
+    async def test_question_list_pages_like_the_sync_view(self):
+        await self.async_client.aforce_login(self.user)
+        await sync_to_async(self.client.force_login)(self.user)
+        for page in ('1', '2', 'last'):
+            with self.subTest(page=page):
+                response = await self.async_client.get(f'/quizes/{self.quiz.pk}/questions/', {'page': page})
+                expected = await sync_to_async(self.client.get)(f'/sync/{self.quiz.pk}/questions/', {'page': page})
+                self.assertEqual((response.status_code, response.json()['count']), (200, 12))
+                self.assertEqual(response.content.replace(b'/quizes/', b'/sync/'), expected.content)
+
+        response = await self.async_client.get(f'/quizes/{self.quiz.pk}/questions/', {'page': 3})
+        self.assertEqual(response.status_code, 404)
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Every named route in core/urls.py has a query budget per method.
+
+    Each request runs against a small and a large quiz and has to stay
+    within its budget, with the same number of queries for both sizes.
+    """
+    small = 2
+    large = 8
+
+    budgets = {
+        'quiz-list': {'GET': 4, 'POST': 12},
+        'quiz-import': {'POST': 16},
+        'quiz-search': {'GET': 2},
+        'quiz-detail': {'GET': 4, 'PUT': 8, 'PATCH': 8, 'DELETE': 25},
+        'quiz-start': {'POST': 8},
+        'quiz-finish': {'POST': 15},
+        'quiz-stats': {'GET': 5},
+        'quiz-leaderboard': {'GET': 1},
+        'quiz-leaderboard-rank': {'GET': 4},
+        'quiz-results-export': {'GET': 3},
+        'attempt-answers': {'PUT': 7},
+        'attempt-questions': {'GET': 3},
+        'attempt-status': {'GET': 1},
+        'question-list': {'GET': 3},
+        'quiz-questions-list': {'GET': 4, 'POST': 7},
+        'quiz-questions-batch': {'POST': 18},
+        'quiz-question-detail': {'GET': 3, 'PUT': 4, 'PATCH': 4, 'DELETE': 9},
+        'answer-options-list': {'GET': 2, 'POST': 3},
+        'answer-option-detail': {'GET': 1, 'PUT': 3, 'PATCH': 3, 'DELETE': 5},
+    }
+
+    def setUp(self):
+        self.user = User.objects.create_user('author', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_data(self, size):
+        """`size` quizzes, questions, options per question and finished players."""
+        quizzes = [
+            Quiz.objects.create(title=f'Quiz {i}', description='', owner=self.user, is_active=True,
+                                sample_size=size - 1, shuffle_options=True)
+            for i in range(size)
+        ]
+        quiz = quizzes[0]
+        Question.objects.bulk_create_with_options(quiz, [
+            {'text': f'Question {i}', 'score': 1, 'options': [
+                {'answer': f'Option {j}', 'is_correct': j == 0} for j in range(size)
+            ]}
+            for i in range(size)
+        ])
+        questions = list(quiz.questions.prefetch_related('options').order_by('pk'))
+        answers = [{'question_id': q.pk, 'option_id': q.options.all()[0].pk} for q in questions]
+
+        for player in [User.objects.create_user(f'player-{i}') for i in range(size)] + [self.user]:
+            start_attempt(quiz, player)
+            finished = finish_attempt(quiz, player, answers)
+        start_attempt(quiz, self.user)
+        autosave_answers(quiz, self.user, answers)
+
+        question = questions[0]
+        option = question.options.all()[0]
+        question_body = {'text': 'Changed', 'score': 2, 'options': [
+            {'answer': f'New {j}', 'is_correct': j == 0} for j in range(size)
+        ]}
+        quiz_body = {'title': 'Imported', 'description': 'Imported', 'is_active': True, 'questions': [question_body] * size}
+        quiz_url = {'pk': quiz.pk}
+        question_url = {'quiz_id': quiz.pk, 'pk': question.pk}
+        options_url = {'quiz_id': quiz.pk, 'question_id': question.pk}
+        option_url = {**options_url, 'pk': option.pk}
+        option_body = {'answer': 'Changed', 'is_correct': False}
+        batch = [{'op': 'create', **question_body} for _ in range(size)]
+        batch += [{'op': 'update', 'id': other.pk, 'score': 3} for other in questions[1:]]
+        batch += [{'op': 'create', 'type': 'option', 'question_id': other.pk, 'answer': 'New'} for other in questions[1:]]
+        batch += [{'op': 'update', 'type': 'option', 'id': other.pk, 'answer': 'Changed'} for other in question.options.all()]
+        batch += [{'op': 'delete', 'id': question.pk}]
+        return {
+            'quiz-list': ({}, quiz_body),
+            'quiz-import': ({}, quiz_body),
+            'quiz-search': ({}, None, {'q': 'quiz'}),
+            'quiz-detail': (quiz_url, {'title': 'Changed', 'description': 'Changed', 'is_active': True}),
+            'quiz-start': (quiz_url, None),
+            'quiz-finish': (quiz_url, {'answers': answers}),
+            'quiz-stats': (quiz_url, None),
+            'quiz-leaderboard': (quiz_url, None),
+            'quiz-leaderboard-rank': (quiz_url, None),
+            'quiz-results-export': (quiz_url, None),
+            'attempt-answers': (quiz_url, {'answers': answers}),
+            'attempt-questions': (quiz_url, None),
+            'attempt-status': ({'pk': finished.pk}, None),
+            'question-list': ({}, None),
+            'quiz-questions-list': ({'quiz_id': quiz.pk}, question_body, {'search': 'question'}),
+            'quiz-questions-batch': ({'quiz_id': quiz.pk}, {'operations': batch}),
+            'quiz-question-detail': (question_url, {'text': 'Changed', 'score': 2}),
+            'answer-options-list': (options_url, option_body),
+            'answer-option-detail': (option_url, option_body),
+        }
+
+    def count_queries(self, size, name, method):
+        with transaction.atomic():
+            kwargs, body, *query = self.create_data(size)[name]
+            if method in ('GET', 'DELETE'):
+                body = None
+            url = reverse(name, kwargs=kwargs) + (f'?{urlencode(query[0])}' if query else '')
+            cache.clear()
+            _answer_keys.clear()
+            _question_ids.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(self.client, method.lower())(url, body, format='json')
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            transaction.set_rollback(True)
+        self.assertLess(response.status_code, 400, f'{method} {name}: {getattr(response, "data", None)}')
+        return len(queries)
+
+    def test_every_route_has_a_budget(self):
+        for pattern in urls.urlpatterns:
+            view = pattern.callback.view_class
+            # async views pass the methods they do not handle to their sync view
+            handlers = (view, view.sync_view) if getattr(view, 'sync_view', None) else (view,)
+            methods = {method.upper() for method in view.http_method_names
+                       if method not in ('head', 'options') and any(hasattr(handler, method) for handler in handlers)}
+            self.assertEqual(set(self.budgets.get(pattern.name, ())), methods, pattern.name)
+
+    def test_query_count_does_not_grow_with_data(self):
+        for name, methods in self.budgets.items():
+            for method, budget in methods.items():
+                with self.subTest(route=name, method=method):
+                    small = self.count_queries(self.small, name, method)
+                    large = self.count_queries(self.large, name, method)
+                    self.assertEqual(small, large, 'query count grows with the data')
+                    self.assertLessEqual(large, budget)
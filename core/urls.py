@@ -1,16 +1,46 @@
+from django.conf import settings
 from django.urls import path
+from . import async_views
 from .views import *
 
-urlpatterns = [
+sync_urlpatterns = [
     path('', QuizListAPIView.as_view(), name='quiz-list'),
+    path('import/', QuizImportAPIView.as_view(), name='quiz-import'),
+    path('search/', QuizSearchAPIView.as_view(), name='quiz-search'),
     path('<int:pk>/', QuizDetailAPIView.as_view(), name='quiz-detail'),
     path('<int:pk>/start/', QuizStartAPIView.as_view(), name='quiz-start'),
     path('<int:pk>/finish/', QuizFinishAPIView.as_view(), name='quiz-finish'),
+    path('<int:pk>/stats/', QuizStatsAPIView.as_view(), name='quiz-stats'),
+    path('<int:pk>/leaderboard/', QuizLeaderboardAPIView.as_view(), name='quiz-leaderboard'),
+    path('<int:pk>/leaderboard/me/', QuizLeaderboardRankAPIView.as_view(), name='quiz-leaderboard-rank'),
+    path('<int:pk>/export/', QuizResultsExportAPIView.as_view(), name='quiz-results-export'),
+    path('<int:pk>/attempt/answers/', AttemptAnswersAPIView.as_view(), name='attempt-answers'),
+    path('<int:pk>/attempt/questions/', AttemptQuestionsAPIView.as_view(), name='attempt-questions'),
+    path('attempts/<int:pk>/', AttemptStatusAPIView.as_view(), name='attempt-status'),
     path('questions/', QuestionListAPIView.as_view(), name='question-list'),
     path('<int:quiz_id>/questions/', QuizQuestionsListAPIView.as_view(), name='quiz-questions-list'),
+    path('<int:quiz_id>/questions/batch/', QuizQuestionsBatchAPIView.as_view(), name='quiz-questions-batch'),
     path('<int:quiz_id>/questions/<int:pk>/', QuizQuestionDetailAPIView.as_view(), name='quiz-question-detail'),
     path('<int:quiz_id>/questions/<int:question_id>/options/', AnswerOptionListAPIView.as_view(),
          name='answer-options-list'),
     path('<int:quiz_id>/questions/<int:question_id>/options/<int:pk>/', AnswerOptionDetailAPIView.as_view(),
          name='answer-option-detail'),
 ]
+
+# the routes QUIZZY_ASYNC_VIEWS serves from async views
+ASYNC_VIEWS = {
+    'quiz-detail': async_views.AsyncQuizDetailView,
+    'quiz-start': async_views.AsyncQuizStartView,
+    'quiz-finish': async_views.AsyncQuizFinishView,
+    'attempt-answers': async_views.AsyncAttemptAnswersView,
+    'quiz-questions-list': async_views.AsyncQuizQuestionsListView,
+    'quiz-question-detail': async_views.AsyncQuizQuestionDetailView,
+}
+
+async_urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS[pattern.name].as_view(), name=pattern.name)
+    if pattern.name in ASYNC_VIEWS else pattern
+    for pattern in sync_urlpatterns
+]
+
+urlpatterns = async_urlpatterns if settings.QUIZZY_ASYNC_VIEWS else sync_urlpatterns
@@ -1,67 +1,145 @@
-import datetime
-from django.shortcuts import render
+import codecs
+
+from django.conf import settings
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import NotFound, PermissionDenied
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from .models import *
 from .serializers import *
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import JSONParser, MultiPartParser
 from .permissions import *
+from . import leaderboard
+from .analytics import quiz_report
+from .batching import BatchFailed, apply_batch
+from .attempts import AttemptError, autosave_answers, finish_attempt, open_attempt, start_attempt, submit_attempt
+from .caching import QuizConditionalGetMixin, QuizResponseCacheMixin
 from .filters import QuestionsFilter
+from .pagination import KeysetPagination
+from .search import search_quizzes
+from .sampling import attempt_questions
+from .exporting import FORMATS, export_rows, filter_attempts, parse_moment, render as render_export
+from .grading import get_answer_key
+from .importing import ImportFailed, iter_records, run_import
 
 
 class QuizListAPIView(generics.ListCreateAPIView):
     permission_classes = (IsAuthenticated,)
     pagination_class = PageNumberPagination
 
+    def is_summary(self):
+        return self.request.query_params.get('view') == 'summary'
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.request.query_params.get('pagination') == 'cursor':
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
     def get_queryset(self):
-        return Quiz.objects.order_by('pk')
+        if self.is_summary():
+            return Quiz.objects.summary().order_by('pk')
+        return Quiz.objects.with_questions().order_by('pk')
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return QuizCreateSerializer
+        if self.is_summary():
+            return QuizSummarySerializer
         return QuizSerializer
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
 
-class QuizDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class QuizSearchAPIView(generics.ListAPIView):
+    serializer_class = QuizSearchSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return search_quizzes(Quiz.objects.summary(), self.request.query_params.get('q'))
+
+
+class QuizImportAPIView(APIView):
+    permission_classes = (IsAuthenticated,)
+    parser_classes = (JSONParser, MultiPartParser)
+
+    def post(self, request, *args, **kwargs):
+        job = None
+        job_id = request.query_params.get('job')
+        if job_id:
+            job = get_object_or_404(ImportJob, pk=job_id, owner=request.user)
+
+        upload = request.FILES.get('file')
+        if upload is not None:
+            records = iter_records(codecs.getreader('utf-8')(upload))
+            source = upload.name
+        elif isinstance(request.data, list):
+            records = request.data
+            source = 'api'
+        else:
+            records = [request.data]
+            source = 'api'
+
+        try:
+            job = run_import(records, request.user, job=job, source=source)
+        except ImportFailed as exc:
+            return Response({"job": ImportJobSerializer(exc.job).data, "error": exc.detail},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(ImportJobSerializer(job).data, status=status.HTTP_201_CREATED)
+
+
+class QuizDetailAPIView(QuizConditionalGetMixin, QuizResponseCacheMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = QuizSerializer
     permission_classes = (IsAuthenticated, IsOwnerOrReadOnly)
+    owner_flag_field = 'is_owner'
 
     def get_queryset(self):
-        return Quiz.objects.all()
+        return Quiz.objects.with_questions()
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        # UpdateModelMixin drops the instance's prefetched questions, respond with a fresh copy
+        serializer.instance = self.get_queryset().get(pk=serializer.instance.pk)
 
 
 class QuestionListAPIView(generics.ListAPIView):
-    queryset = Question.objects.order_by('pk')
+    queryset = Question.objects.prefetch_related('options').order_by('pk')
     serializer_class = QuestionSerializer
     permission_classes = (IsAuthenticated,)
 
 
-class QuizQuestionDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class QuizQuestionDetailAPIView(QuizConditionalGetMixin, QuizResponseCacheMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = QuestionSerializer
     permission_classes = (IsAuthenticated,)
+    quiz_lookup_url_kwarg = 'quiz_id'
 
     def get_queryset(self):
-        return Question.objects.filter(quiz=self.kwargs['quiz_id'])
+        return with_quiz_owner(Question.objects.filter(quiz=self.kwargs['quiz_id']), 'quiz')
 
     def check_object_permissions(self, request, obj):
         super().check_object_permissions(request, obj)
         if request.method not in ['GET', 'HEAD', 'OPTIONS']:
-            if obj.quiz.owner != request.user:
+            if obj.quiz_owner_id != request.user.id:
                 raise PermissionDenied("You can only edit questions in your quizzes.")
 
 
-class QuizQuestionsListAPIView(generics.ListCreateAPIView):
+class QuizQuestionsListAPIView(QuizConditionalGetMixin, QuizResponseCacheMixin, generics.ListCreateAPIView):
     permission_classes = (IsAuthenticated,)
     filterset_class = QuestionsFilter
+    quiz_lookup_url_kwarg = 'quiz_id'
 
     def get_queryset(self):
-        return Question.objects.filter(quiz=self.kwargs['quiz_id']).order_by('pk')
+        return Question.objects.filter(quiz=self.kwargs['quiz_id']).prefetch_related('options').order_by('pk')
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -70,12 +148,36 @@ class QuizQuestionsListAPIView(generics.ListCreateAPIView):
 
     def perform_create(self, serializer):
         quiz_id = self.kwargs['quiz_id']
-        quiz = Quiz.objects.get(id=quiz_id)
+        owner_id = quiz_owner_id(self.request, quiz_id)
 
-        if quiz.owner != self.request.user:
+        if owner_id is None:
+            raise NotFound()
+        if owner_id != self.request.user.id:
             raise PermissionDenied("You can only create questions in your quizzes.")
 
-        serializer.save(quiz=quiz)
+        # creating the questions only takes the quiz's id
+        serializer.save(quiz=Quiz(pk=quiz_id, owner_id=owner_id))
+
+
+class QuizQuestionsBatchAPIView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, *args, **kwargs):
+        quiz_id = self.kwargs['quiz_id']
+        owner_id = quiz_owner_id(request, quiz_id)
+
+        if owner_id is None:
+            raise NotFound()
+        if owner_id != request.user.id:
+            raise PermissionDenied("You can only edit questions in your quizzes.")
+
+        operations = request.data.get("operations") if isinstance(request.data, dict) else None
+        try:
+            results = apply_batch(quiz_id, operations)
+        except BatchFailed as exc:
+            return Response({"error": exc.detail, "results": exc.results}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({"results": results}, status=status.HTTP_200_OK)
 
 
 class AnswerOptionListAPIView(generics.ListCreateAPIView):
@@ -83,16 +185,18 @@ class AnswerOptionListAPIView(generics.ListCreateAPIView):
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
-        return AnswerOption.objects.filter(question=self.kwargs['question_id'])
+        return AnswerOption.objects.filter(question=self.kwargs['question_id'], question__quiz=self.kwargs['quiz_id'])
 
     def perform_create(self, serializer):
         question_id = self.kwargs['question_id']
-        question = Question.objects.get(id=question_id)
+        owner_id = quiz_owner_id(self.request, self.kwargs['quiz_id'], question_id)
 
-        if question.quiz.owner != self.request.user:
+        if owner_id is None:
+            raise NotFound()
+        if owner_id != self.request.user.id:
             raise PermissionDenied("You can only create answer options in your quizzes.")
 
-        serializer.save(question=question)
+        serializer.save(question_id=question_id)
 
 
 class AnswerOptionDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
@@ -100,12 +204,15 @@ class AnswerOptionDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
-        return AnswerOption.objects.filter(question=self.kwargs['question_id'])
+        return with_quiz_owner(
+            AnswerOption.objects.filter(question=self.kwargs['question_id'], question__quiz=self.kwargs['quiz_id']),
+            'question__quiz',
+        )
 
     def check_object_permissions(self, request, obj):
         super().check_object_permissions(request, obj)
         if request.method not in ['GET', 'HEAD', 'OPTIONS']:
-            if obj.question.quiz.owner != request.user:
+            if obj.quiz_owner_id != request.user.id:
                 raise PermissionDenied("You can only change answer options in your quizzes.")
 
 
@@ -114,66 +221,166 @@ class QuizStartAPIView(APIView):
 
     def post(self, request, *args, **kwargs):
         quiz_id = self.kwargs['pk']
-        quiz = Quiz.objects.get(id=quiz_id)
-        
-        attempt = Attempt.objects.filter(
-            quiz=quiz,
-            user=request.user,
-            completed_at__isnull=True,
-        ).first()
-
-        if attempt:
-            serializer = AttemptSerializer(attempt)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-
-        attempt = Attempt.objects.create(
-            quiz=quiz,
-            user=request.user,
-        )
+        quiz = Quiz.objects.only('title', 'content_version', 'sample_size').get(id=quiz_id)
+
+        attempt, created = start_attempt(quiz, request.user)
+
         serializer = AttemptSerializer(attempt)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        if created:
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class QuizFinishAPIView(APIView):
+class AttemptAnswersAPIView(APIView):
     permission_classes = (IsAuthenticated,)
 
-    def post(self, request, *args, **kwargs):
-        quiz_id = self.kwargs['pk']
-        quiz = Quiz.objects.get(id=quiz_id)
-        
-        attempt = Attempt.objects.filter(
-            quiz=quiz,
-            user=request.user,
-            completed_at__isnull=True,
-        ).first()
-        
+    def put(self, request, *args, **kwargs):
+        quiz = get_object_or_404(Quiz, id=self.kwargs['pk'])
+        if not isinstance(request.data, dict):
+            return Response({"error": "Expected an object."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            attempt, saved = autosave_answers(quiz, request.user, request.data.get("answers", []))
+        except AttemptError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({"attempt_id": attempt.id, "saved": sorted(saved)}, status=status.HTTP_200_OK)
+
+
+class AttemptQuestionsAPIView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        attempt = open_attempt(self.kwargs['pk'], request.user).select_related('quiz').first()
         if not attempt:
             return Response({"error": "No active attempts."}, status=status.HTTP_400_BAD_REQUEST)
 
-        answer_data = request.data.get("answers", [])
+        serializer = AttemptQuestionSerializer(attempt_questions(attempt), many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class QuizResultsExportAPIView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        quiz = get_object_or_404(Quiz.objects.only('owner_id'), pk=self.kwargs['pk'])
+        if quiz.owner_id != request.user.id:
+            raise PermissionDenied("You can only export results of your quizzes.")
+
+        kind = request.query_params.get('kind', 'attempts')
+        output_format = request.query_params.get('output', 'csv')
+        if kind not in ('attempts', 'answers') or output_format not in FORMATS:
+            return Response({"error": "Unsupported export."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            since = parse_moment(request.query_params.get('since'))
+            until = parse_moment(request.query_params.get('until'))
+        except ValueError:
+            return Response({"error": "Invalid date."}, status=status.HTTP_400_BAD_REQUEST)
+
+        header, rows = export_rows(kind, filter_attempts(quiz.pk, since, until))
+        response = StreamingHttpResponse(render_export(output_format, header, rows), content_type=FORMATS[output_format])
+        response['Content-Disposition'] = f'attachment; filename="quiz-{quiz.pk}-{kind}.{output_format}"'
+        return response
+
+
+class QuizStatsAPIView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        quiz = get_object_or_404(Quiz.objects.only('owner_id', 'content_version', 'sample_size'), pk=self.kwargs['pk'])
+        if quiz.owner_id != request.user.id:
+            raise PermissionDenied("You can only view statistics of your quizzes.")
+
+        return Response(quiz_report(quiz, get_answer_key(quiz)), status=status.HTTP_200_OK)
+
+
+class QuizLeaderboardAPIView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        quiz_id = self.kwargs['pk']
+        try:
+            limit = min(int(request.query_params.get('limit', leaderboard.DEFAULT_LIMIT)), leaderboard.MAX_LIMIT)
+        except ValueError:
+            return Response({"error": "Invalid limit."}, status=status.HTTP_400_BAD_REQUEST)
+
+        entries = []
+        for rank, entry in leaderboard.top(quiz_id, max(limit, 1)):
+            entry.rank = rank
+            entries.append(entry)
 
-        if not answer_data:
-            return Response({"error": "No answer data."}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = LeaderboardEntrySerializer(entries, many=True)
+        return Response({"results": serializer.data}, status=status.HTTP_200_OK)
 
-        score = 0
-        for answer in answer_data:
+
+class QuizLeaderboardRankAPIView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        quiz_id = self.kwargs['pk']
+        attempt_id = request.query_params.get('attempt')
+
+        if attempt_id:
             try:
-                question = Question.objects.get(id=answer["question_id"], quiz=quiz)
-                option = AnswerOption.objects.get(id=answer["option_id"], question=question)
-            except (Question.DoesNotExist, AnswerOption.DoesNotExist):
-                continue
-            UserAnswer.objects.update_or_create(
-                attempt=attempt,
-                question=question,
-                defaults={"select": option}
-            )
+                attempt_id = int(attempt_id)
+            except ValueError:
+                return Response({"error": "Invalid attempt."}, status=status.HTTP_400_BAD_REQUEST)
+            position = Attempt.objects.filter(
+                pk=attempt_id, quiz_id=quiz_id, user=request.user, completed_at__isnull=False,
+            ).first()
+            if position is None:
+                return Response({"error": "No such completed attempt."}, status=status.HTTP_404_NOT_FOUND)
+            attempt_id, score, completed_at = position.id, position.score, position.completed_at
+        else:
+            entry = LeaderboardEntry.objects.filter(quiz_id=quiz_id, user=request.user).first()
+            if entry is None:
+                return Response({"error": "No completed attempts."}, status=status.HTTP_404_NOT_FOUND)
+            attempt_id, score, completed_at = entry.attempt_id, entry.score, entry.completed_at
+
+        return Response({
+            "rank": leaderboard.rank_of(quiz_id, score, completed_at, attempt_id),
+            "attempt_id": attempt_id,
+            "score": score,
+            "completed_at": completed_at,
+        }, status=status.HTTP_200_OK)
+
+
+class QuizFinishAPIView(APIView):
+    permission_classes = (IsAuthenticated,)
 
-            if option.is_correct:
-                score += question.score
+    def post(self, request, *args, **kwargs):
+        quiz = get_object_or_404(Quiz, id=self.kwargs['pk'])
+        if not isinstance(request.data, dict):
+            return Response({"error": "Expected an object."}, status=status.HTTP_400_BAD_REQUEST)
+        answers = request.data.get("answers", [])
 
-        attempt.score = score
-        attempt.completed_at = datetime.datetime.now()
-        attempt.save()
+        if settings.QUIZ_DEFERRED_GRADING:
+            try:
+                attempt = submit_attempt(quiz, request.user, answers)
+            except AttemptError as exc:
+                return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({"attempt_id": attempt.id, "status": "queued"}, status=status.HTTP_202_ACCEPTED)
+
+        try:
+            attempt = finish_attempt(quiz, request.user, answers)
+        except AttemptError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
         serializer = AttemptSerializer(attempt)
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class AttemptStatusAPIView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        attempts = Attempt.objects.select_related('grading_job')
+        attempt = get_object_or_404(attempts, pk=self.kwargs['pk'], user=request.user)
+        if attempt.result is None:
+            # not graded yet, serialize the live answers
+            attempt.user = request.user
+            prefetch_related_objects(
+                [attempt], 'quiz', Prefetch('answers', queryset=UserAnswer.objects.select_related('question', 'select')),
+            )
+        return Response(AttemptStatusSerializer(attempt).data, status=status.HTTP_200_OK)